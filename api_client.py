@@ -0,0 +1,138 @@
+# api_client.py
+"""
+HTTP data layer for the Streamlit app.
+
+Every call goes through one keep-alive requests.Session shared by all
+reruns and browser sessions. Cookies are not: the shared session refuses
+them, and each browser session keeps its own jar in st.session_state, so
+the API's read-your-writes cookie only follows the user who wrote.
+Reference data (users and groups) is kept
+in st.cache_data for CLIENT_CACHE_TTL seconds and dropped as soon as a
+write through this module succeeds, so widget interactions stop
+refetching it. Pickers search by name prefix, so only one page of
+reference data is fetched however large the tables grow. Each HTTP call
+made during a rerun is timed, together with the server's Server-Timing
+header, for the debug sidebar.
+"""
+
+import os
+from http.cookiejar import DefaultCookiePolicy
+from time import perf_counter
+from typing import Dict, List
+
+import requests
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+BASE_URL = os.getenv("BASE_URL")
+CLIENT_CACHE_TTL = int(os.getenv("CLIENT_CACHE_TTL", "60"))
+
+# Largest number of groups GET /groups/balances accepts per call
+BALANCES_BATCH = 100
+# Users or groups offered by a picker; typing more of a name narrows them down
+PICKER_LIMIT = 100
+
+
+class ApiError(Exception):
+    """A non-2xx response, carrying the API's error detail."""
+
+    def __init__(self, res: requests.Response):
+        try:
+            detail = res.json().get("detail", "Unknown error")
+        except ValueError:  # JSONDecodeError
+            detail = res.text or "No response body or invalid JSON"
+        super().__init__(detail)
+        self.status_code = res.status_code
+        self.detail = detail
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    session = requests.Session()
+    # Shared by every browser session, so it must not keep anyone's cookies
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def _cookies() -> requests.cookies.RequestsCookieJar:
+    """This browser session's cookies for the API."""
+    return st.session_state.setdefault("api_cookies", requests.cookies.RequestsCookieJar())
+
+
+def _request(method: str, path: str, **kwargs):
+    start = perf_counter()
+    cookies = _cookies()
+    res = _session().request(method, f"{BASE_URL}{path}", cookies=cookies, **kwargs)
+    cookies.update(res.cookies)
+    st.session_state.setdefault("api_timings", []).append({
+        "call": f"{method} {path}",
+        "status": res.status_code,
+        "ms": round((perf_counter() - start) * 1000, 1),
+        "server": res.headers.get("server-timing", ""),
+    })
+    if not res.ok:
+        raise ApiError(res)
+    return res.json()
+
+
+# --- Timing instrumentation ---
+def begin_run() -> None:
+    """Starts a fresh timing log; call once at the top of each rerun."""
+    st.session_state["api_timings"] = []
+
+
+def timings() -> List[Dict]:
+    """The HTTP calls made so far in this rerun; cached reads make none."""
+    return st.session_state.get("api_timings", [])
+
+
+# --- Cached reference data ---
+@st.cache_data(ttl=CLIENT_CACHE_TTL, show_spinner=False)
+def get_users(prefix: str = "") -> Dict:
+    """First page of users whose username starts with prefix."""
+    return _request("GET", "/users/", params={"q": prefix, "limit": PICKER_LIMIT})
+
+
+@st.cache_data(ttl=CLIENT_CACHE_TTL, show_spinner=False)
+def get_groups(prefix: str = "") -> Dict:
+    """First page of groups whose name starts with prefix, with their members."""
+    return _request("GET", "/groups", params={"q": prefix, "limit": PICKER_LIMIT, "include_members": "true"})
+
+
+# --- Live reads ---
+def get_user_summary(email: str) -> Dict:
+    return _request("GET", "/users/summary/", params={"email": email})
+
+
+def get_settlement_plans(group_ids: List[int]) -> Dict[int, Dict]:
+    """Settlement plan per group id, fetched in batches."""
+    plans = {}
+    for start in range(0, len(group_ids), BALANCES_BATCH):
+        sheets = _request("GET", "/groups/balances", params={
+            "ids": group_ids[start:start + BALANCES_BATCH], "include_settlements": "true"
+        })
+        plans.update({sheet["group_id"]: sheet["settlement"] for sheet in sheets})
+    return plans
+
+
+def get_group_expenses(group_id: int, limit: int = 50) -> Dict:
+    return _request("GET", f"/groups/{group_id}/expenses/", params={"limit": limit})
+
+
+# --- Writes ---
+def create_user(username: str, email: str) -> Dict:
+    user = _request("POST", "/users/", json={"username": username, "email": email})
+    get_users.clear()
+    return user
+
+
+def create_group(name: str, member_ids: List[int]) -> Dict:
+    group = _request("POST", "/groups/", json={"name": name, "member_ids": member_ids})
+    get_groups.clear()
+    return group
+
+
+def create_expense(group_id: int, payload: Dict) -> Dict:
+    # Expenses don't change the user or group lists, so the caches stay
+    return _request("POST", f"/groups/{group_id}/expenses/", json=payload)
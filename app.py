@@ -1,19 +1,18 @@
 # app.py
-import os
 import streamlit as st
-import requests
-from dotenv import load_dotenv
+import api_client
+from api_client import ApiError
+from money import split_evenly
 
 
-load_dotenv()
-BASE_URL = os.getenv("BASE_URL")
-
 st.set_page_config(page_title="Expense Splitter", page_icon="💸", layout="wide")
+api_client.begin_run()
 
 st.title("💸 Expense Splitter App")
 st.sidebar.header("Navigation")
 
 page = st.sidebar.radio("Go to", ["Create User", "Create Group", "Add Expense", "View Summary"])
+show_timings = st.sidebar.checkbox("Show API timings")
 
 # --- CREATE USER ---
 if page == "Create User":
@@ -22,44 +21,40 @@ if page == "Create User":
     email = st.text_input("Email")
 
     if st.button("Create User"):
-        payload = {"username": username, "email": email}
-        res = requests.post(f"{BASE_URL}/users/", json=payload)
-        if res.status_code == 201:
+        try:
+            api_client.create_user(username, email)
             st.success("✅ User created successfully!")
-            # st.json(res.json())
-        else:
-            try:
-                error_detail = res.json().get("detail", "Unknown error")
-            except ValueError:  # JSONDecodeError
-                error_detail = res.text or "No response body or invalid JSON"
-            st.error(f"❌ Error: {error_detail}")
+        except ApiError as e:
+            st.error(f"❌ Error: {e.detail}")
 
 # --- CREATE GROUP ---
 elif page == "Create Group":
     st.header("👥 Create a New Group")
 
-    # Fetch all users from the backend
-    users_res = requests.get(f"{BASE_URL}/users/")  # no email param
-    if users_res.status_code == 200:
-        try:
-            users_data = users_res.json()
-            # st.write(users_data)  # debug: see what you got
-        except ValueError:
-            st.error("Response is not valid JSON")
-    else:
-        st.error(f"Failed to fetch users: {users_res.status_code} - {users_res.text}")
-    if users_res.status_code == 200:
-        users_data = users_res.json()  # assuming it's a list of dicts with 'id' and 'name'
-        # Create a mapping of name -> id
-        user_options = {user['username']: user['id'] for user in users_data}
+    # Search users by name; each page of results is cached between reruns
+    search = st.text_input("Search Users", placeholder="Start of a username")
+    try:
+        users_page = api_client.get_users(search.strip())
+    except ApiError as e:
+        users_page = None
+        st.error(f"Failed to fetch users: {e.status_code} - {e.detail}")
+
+    if users_page is not None:
+        # Create a mapping of name -> id, keeping earlier picks selectable after a new search
+        picked = st.session_state.get("picked_members", {})
+        user_options = {**picked, **{user['username']: user['id'] for user in users_page['items']}}
+        if users_page['next_cursor'] is not None:
+            st.caption(f"Showing the first {len(users_page['items'])} matches. Type more of the name to narrow them down.")
 
         group_name = st.text_input("Group Name")
 
         # Multi-select dropdown showing names but storing ids
         selected_names = st.multiselect(
             "Select Members",
-            options=list(user_options.keys())
+            options=list(user_options.keys()),
+            key="member_names"
         )
+        st.session_state["picked_members"] = {name: user_options[name] for name in selected_names}
         # Convert selected names to IDs
         member_list = [user_options[name] for name in selected_names]
 
@@ -67,36 +62,26 @@ elif page == "Create Group":
             if not group_name or not member_list:
                 st.error("Please enter a group name and select at least one member.")
             else:
-                payload = {"name": group_name, "member_ids": member_list}
-                res = requests.post(f"{BASE_URL}/groups/", json=payload)
-                if res.status_code == 201:
+                try:
+                    api_client.create_group(group_name, member_list)
                     st.success("✅ Group created successfully!")
-                    # st.json(res.json())
-                else:
-                    try:
-                        error_detail = res.json().get("detail", "Unknown error")
-                    except ValueError:  # JSONDecodeError
-                        error_detail = res.text or "No response body or invalid JSON"
-                    st.error(f"❌ Error: {error_detail}")
-    else:
-        st.error("Failed to fetch users from backend.")
+                except ApiError as e:
+                    st.error(f"❌ Error: {e.detail}")
 
 
 # --- ADD EXPENSE ---
 elif page == "Add Expense":
     st.header("💰 Add a New Expense")
-    group_res = requests.get(f"{BASE_URL}/groups")
 
-    if group_res.status_code == 200:
-        try:
-            users_data = group_res.json()
-        except ValueError:
-            st.error("Response is not valid JSON")
-    else:
-        st.error(f"Failed to fetch users: {group_res.status_code} - {group_res.text}")
+    # Search groups by name; each page of results, with members, is cached between reruns
+    search = st.text_input("Search Groups", placeholder="Start of a group name")
+    try:
+        group_data = api_client.get_groups(search.strip())['items']
+    except ApiError as e:
+        group_data = None
+        st.error(f"Failed to fetch groups: {e.status_code} - {e.detail}")
 
-    if group_res.status_code == 200:
-        group_data = group_res.json() 
+    if group_data:
         group_options = {group['name'] : group['id'] for group in group_data}
         selected_group = st.selectbox(
             "Select a Group",
@@ -109,7 +94,7 @@ elif page == "Add Expense":
 
 
         description = st.text_input("Description")
-        amount = st.number_input("Total Amount", min_value=0.0, step=0.01)
+        amount = st.number_input("Total Amount", min_value=0.01, step=0.01)
         paid_by_username = st.selectbox(
             "Paid By (Select User)",
             options=list(user_options.keys())  # show usernames
@@ -124,115 +109,122 @@ elif page == "Add Expense":
 
         participant_list = [user_options[name] for name in selected_usernames]
 
+        # Uneven splits take one value per selected member
+        split_labels = {"Equally": "equal", "By shares": "shares", "By percentage": "percentage", "By exact amounts": "exact"}
+        split = split_labels[st.selectbox("Split", options=list(split_labels.keys()))]
+        split_values = None
+        if split != "equal" and selected_usernames:
+            count = len(selected_usernames)
+            defaults = {
+                "shares": [1.0] * count,
+                # Hundredths of a percent split like cents, so the untouched defaults add up to exactly 100
+                "percentage": [hundredths / 100 for hundredths in split_evenly(100 * 100, count)],
+                "exact": [0.0] * count,
+            }[split]
+            split_values = [
+                st.number_input(f"{name}", min_value=0.0, value=default, step=0.01 if split == "exact" else 1.0,
+                                key=f"split_{split}_{name}")
+                for name, default in zip(selected_usernames, defaults)
+            ]
+
         if st.button("Add Expense"):
+            payload = {
+                "description": description,
+                "amount": amount,
+                "paid_by_user_id": paid_by_user_id,
+                "participant_user_ids": participant_list,
+                "split": split,
+                "split_values": split_values
+            }
             try:
-                # participant_list = [int(i.strip()) for i in participant_ids.split(",") if i.strip()]
-                payload = {
-                    "description": description,
-                    "amount": amount,
-                    "paid_by_user_id": paid_by_user_id,
-                    "participant_user_ids": participant_list
-                }
-                res = requests.post(f"{BASE_URL}/groups/{group_id}/expenses/", json=payload)
-                if res.status_code == 201:
-                    st.success("✅ Expense added successfully!")
-                    # st.json(res.json())
-                else:
-                    st.error(f"❌ Error: {res.json().get('detail')}")
-            except Exception as e:
-                st.error(f"Invalid input: {e}")
-    else:
-        st.error("Failed to fetch groups from backend.")
+                api_client.create_expense(group_id, payload)
+                st.success("✅ Expense added successfully!")
+            except ApiError as e:
+                st.error(f"❌ Error: {e.detail}")
+    elif group_data is not None:
+        st.info("No matching groups. Create one first or change the search.")
 
 # --- VIEW SUMMARY ---
 elif page == "View Summary":
     st.header("📊 View User Summary")
     email = st.text_input("Enter User Email")
 
-    # This function is correct and doesn't need changes.
-    # It takes a dictionary of balances like {"Alice": 50, "Bob": -50}
-    # and calculates who should pay whom.
-    def compute_settlements(balances):
-        debtors = {name: -amt for name, amt in balances.items() if amt < 0}
-        creditors = {name: amt for name, amt in balances.items() if amt > 0}
-        settlements = []
-
-        # Convert to lists for easier manipulation
-        debtor_items = sorted(debtors.items(), key=lambda x: x[1])
-        creditor_items = sorted(creditors.items(), key=lambda x: x[1])
-
-        i, j = 0, 0
-        while i < len(debtor_items) and j < len(creditor_items):
-            debtor, debt_amt = debtor_items[i]
-            creditor, cred_amt = creditor_items[j]
-
-            payment = min(debt_amt, cred_amt)
-            
-            if payment > 0.01: # Avoid negligible payments
-                settlements.append(f"💸 **{debtor}** pays ₹{payment:.2f} to **{creditor}**")
-
-                new_debt = debt_amt - payment
-                new_credit = cred_amt - payment
-
-                debtor_items[i] = (debtor, new_debt)
-                creditor_items[j] = (creditor, new_credit)
-
-            if new_debt < 0.01:
-                i += 1
-            if new_credit < 0.01:
-                j += 1
-        return settlements
-
     if st.button("Get Summary"):
-        # 1. Get the summary for the specific user
-        res = requests.get(f"{BASE_URL}/users/summary/", params={"email": email})
-        
-        if res.status_code == 200:
-            data = res.json()
-            st.success(f"Summary for {data['username']} ({data['email']})")
-
-            # 2. Iterate through each group the user is in
-            for group in data['groups']:
-                with st.expander(f"Group: {group['group_name']} (ID: {group['group_id']})", expanded=True):
-                    # Display personal summary
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.metric("You Paid", f"₹{group['total_you_paid']:.2f}")
-                        st.metric("Your Share", f"₹{group['your_total_share']:.2f}")
-                        
-                        balance_val = group['net_balance']
-                        if balance_val >= 0:
-                            st.metric("Your Net Balance", f"₹{balance_val:.2f}", "You are owed")
-                        else:
-                            st.metric("Your Net Balance", f"₹{balance_val:.2f}", "You owe")
+        st.session_state.pop("summary", None)
+        try:
+            # 1. Get the summary for the specific user
+            data = api_client.get_user_summary(email)
+        except ApiError as e:
+            data = None
+            st.error(f"❌ Error: {e.detail}")
+
+        if data is not None:
+            # 2. Fetch every group's settlement plan in batched calls
+            try:
+                plans = api_client.get_settlement_plans([group['group_id'] for group in data['groups']])
+            except ApiError:
+                plans = None
+            # Kept for the reruns that expand a group's history, so those only fetch that history
+            st.session_state["summary"] = (data, plans)
+
+    if "summary" in st.session_state:
+        data, plans = st.session_state["summary"]
+        st.success(f"Summary for {data['username']} ({data['email']})")
+        if plans is None:
+            plans = {}
+            st.error("Could not fetch the settlement plans.")
+
+        # 3. Show each group the user is in
+        for group in data['groups']:
+            with st.expander(f"Group: {group['group_name']} (ID: {group['group_id']})", expanded=True):
+                # Display personal summary
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.metric("You Paid", f"₹{group['total_you_paid']:.2f}")
+                    st.metric("Your Share", f"₹{group['your_total_share']:.2f}")
+                    
+                    balance_val = group['net_balance']
+                    if balance_val >= 0:
+                        st.metric("Your Net Balance", f"₹{balance_val:.2f}", "You are owed")
+                    else:
+                        st.metric("Your Net Balance", f"₹{balance_val:.2f}", "You owe")
+                
+                with col2:
+                    st.subheader("Settlement Plan")
+                    group_id = group['group_id']
+                    plan = plans.get(group_id)
                     
-                    with col2:
-                        st.subheader("Settlement Plan")
-                        # 3. Fetch balances for ALL members in this group
-                        group_id = group['group_id']
-                        balances_res = requests.get(f"{BASE_URL}/groups/{group_id}/balances/")
+                    if plan is not None:
+                        transfers = plan['transfers']
                         
-                        if balances_res.status_code == 200:
-                            all_balances = balances_res.json()
-                            
-                            # 4. Compute and display settlements
-                            settlements = compute_settlements(all_balances)
-                            if settlements:
-                                for s in settlements:
-                                    st.markdown(s)
-                            else:
-                                st.markdown("✅ All settled up!")
+                        # 4. Display who pays whom
+                        if transfers:
+                            for t in transfers:
+                                st.markdown(f"💸 **{t['from_username']}** pays ₹{t['amount']:.2f} to **{t['to_username']}**")
                         else:
-                            st.error("Could not fetch group balances for settlement.")
-                    
-                    st.divider()
-                    st.subheader("Expense History")
-                    for exp in group['expenses']:
-                        st.write(f"🧾 {exp['description']} — ₹{exp['amount']} (Paid by User ID: {exp['paid_by_user_id']})")
-
-        else:
-            try:
-                error_detail = res.json().get("detail", "Unknown error")
-            except ValueError:  # JSONDecodeError
-                error_detail = res.text or "No response body or invalid JSON"
-            st.error(f"❌ Error: {error_detail}")
+                            st.markdown("✅ All settled up!")
+                    else:
+                        st.error("Could not fetch the settlement plan for this group.")
+                
+                st.divider()
+                # 5. Fetch the first page of a group's expense history only when it is asked for
+                if st.toggle(f"Expense History ({group['expense_count']})", key=f"history-{group_id}"):
+                    try:
+                        page_data = api_client.get_group_expenses(group_id, limit=50)
+                        for exp in page_data['items']:
+                            st.write(f"🧾 {exp['description']} — ₹{exp['amount']} (Paid by User ID: {exp['paid_by_user_id']})")
+                        if page_data['next_cursor'] is not None:
+                            st.caption(f"Showing the first {len(page_data['items'])} of {group['expense_count']} expenses.")
+                    except ApiError:
+                        st.error("Could not fetch the group's expense history.")
+
+# --- DEBUG: API TIMINGS ---
+# Rendered last so it covers every call made during this rerun
+if show_timings:
+    calls = api_client.timings()
+    st.sidebar.subheader("API calls this run")
+    if calls:
+        st.sidebar.caption(f"{len(calls)} calls, {sum(c['ms'] for c in calls):.1f} ms total")
+        st.sidebar.dataframe(calls, hide_index=True)
+    else:
+        st.sidebar.caption("None: everything came from the client cache.")
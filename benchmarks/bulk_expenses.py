@@ -0,0 +1,77 @@
+# benchmarks/bulk_expenses.py
+"""
+Throughput of the single-row expense endpoint against the bulk endpoint.
+
+Runs against a live API (BASE_URL from the environment or --base-url) and
+writes real expenses into the given group, so point it at a scratch database:
+
+    python benchmarks/bulk_expenses.py --group-id 1 --count 2000 --batch-size 500
+"""
+
+import argparse
+import os
+import time
+
+import requests
+from dotenv import load_dotenv
+
+
+def make_rows(member_ids, count):
+    return [
+        {
+            "description": f"bench expense {i}",
+            "amount": round(10 + (i % 97) * 1.37, 2),
+            "paid_by_user_id": member_ids[i % len(member_ids)],
+            "participant_user_ids": member_ids,
+        }
+        for i in range(count)
+    ]
+
+
+def run_single(session, base_url, group_id, rows):
+    start = time.perf_counter()
+    for row in rows:
+        res = session.post(f"{base_url}/groups/{group_id}/expenses/", json=row)
+        res.raise_for_status()
+    return time.perf_counter() - start
+
+
+def run_bulk(session, base_url, group_id, rows, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(rows), batch_size):
+        res = session.post(f"{base_url}/groups/{group_id}/expenses/bulk", json=rows[i:i + batch_size])
+        res.raise_for_status()
+        errors = res.json()["errors"]
+        if errors:
+            raise RuntimeError(f"bulk upload rejected rows: {errors[:3]}")
+    return time.perf_counter() - start
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL"))
+    parser.add_argument("--group-id", type=int, required=True)
+    parser.add_argument("--count", type=int, default=1000, help="expenses per mode")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per bulk request")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    page = session.get(f"{args.base_url}/groups", params={
+        "after_id": args.group_id - 1, "limit": 1, "include_members": "true"
+    }).json()
+    group = next(g for g in page["items"] if g["id"] == args.group_id)
+    member_ids = [member["id"] for member in group["members"]]
+    rows = make_rows(member_ids, args.count)
+
+    single = run_single(session, args.base_url, args.group_id, rows)
+    bulk = run_bulk(session, args.base_url, args.group_id, rows, args.batch_size)
+
+    print(f"{'mode':<8}{'seconds':>10}{'expenses/s':>14}")
+    print(f"{'single':<8}{single:>10.2f}{args.count / single:>14.1f}")
+    print(f"{'bulk':<8}{bulk:>10.2f}{args.count / bulk:>14.1f}")
+    print(f"speedup: {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# benchmarks/coldstart.py
+"""
+Cold-start cost of an API worker: what each of N workers pays before it
+can serve, and how many database connections it opens to get there.
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/coldstart.py \\
+        --runs 10 --json coldstart.json --label baseline
+
+For every run a fresh interpreter imports main (timed, with connections
+counted on every pool), then a fresh uvicorn process is started and
+polled until GET / answers (ready) and until a query-backed endpoint
+answers (first query). With --workers N, gunicorn is also started with
+gunicorn.conf.py and timed until all N workers report startup complete.
+Point it at a database that is already migrated (python migrate.py).
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from latency import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: imports the app with a listener on every pool
+IMPORT_PROBE = """
+import json, time
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = [0]
+event.listen(Pool, "connect", lambda *_: connections.__setitem__(0, connections[0] + 1))
+start = time.perf_counter()
+import main
+print(json.dumps({"import_s": time.perf_counter() - start, "connections": connections[0]}))
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import():
+    out = subprocess.run([sys.executable, "-c", IMPORT_PROBE], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def measure_serve(timeout):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        ready = wait_for(f"{base}/", start + timeout)
+        first_query = wait_for(f"{base}/users/?limit=1", start + timeout)
+        return {"ready_s": ready - start, "first_query_s": first_query - start}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure_fleet(workers, timeout):
+    """Seconds until all of gunicorn's workers have finished their startup."""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{free_port()}")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        started = 0
+        for line in server.stderr:
+            if "Application startup complete" in line:
+                started += 1
+                if started == workers:
+                    return time.perf_counter() - start
+            if time.perf_counter() - start > timeout:
+                break
+        raise TimeoutError(f"{started} of {workers} workers started")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a server")
+    parser.add_argument("--workers", type=int, default=0, help="also time a gunicorn fleet of this size")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    samples = {"import": [], "ready": [], "first query": []}
+    connections = []
+    for _ in range(args.runs):
+        probe = measure_import()
+        samples["import"].append(probe["import_s"])
+        connections.append(probe["connections"])
+        serve = measure_serve(args.timeout)
+        samples["ready"].append(serve["ready_s"])
+        samples["first query"].append(serve["first_query_s"])
+        if args.workers:
+            samples.setdefault(f"{args.workers} workers", []).append(measure_fleet(args.workers, args.timeout))
+
+    results = {
+        "label": args.label,
+        "connections_at_import": max(connections),
+        "results": {name: summarize(values) for name, values in samples.items()},
+    }
+    print(f"[{args.label}] connections opened by importing main: {results['connections_at_import']}")
+    print(f"{'phase':<16}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["results"].items():
+        print(f"{name:<16}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/compare.py
+"""
+Compares two result files written with --json by micro.py, loadtest.py,
+serialization.py or latency.py, e.g. a baseline run against a branch:
+
+    python benchmarks/compare.py baseline.json branch.json --threshold 10
+
+Lists the change in every shared metric and exits with status 1 when a
+latency, statement count, CPU time or response size got worse by more than --threshold percent.
+"""
+
+import argparse
+import json
+import sys
+
+# Sections of a result file that map case names to metrics
+SECTIONS = ("results", "pages", "endpoints")
+# Metrics where a higher value is a regression
+METRICS = ("p50_ms", "p99_ms", "statements_per_call", "cpu_ms", "bytes")
+
+
+def rows(before, after):
+    for section in SECTIONS:
+        for name, old in before.get(section, {}).items():
+            new = after.get(section, {}).get(name)
+            if new is None:
+                continue
+            for metric in METRICS:
+                if old.get(metric) is not None and new.get(metric) is not None:
+                    yield f"{section}/{name}", metric, old[metric], new[metric]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent worse that counts as a regression")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before.get('label', args.before)} -> {after.get('label', args.after)}")
+    print(f"{'case':<50}{'metric':<22}{'before':>10}{'after':>10}{'change':>9}")
+    regressions = 0
+    for name, metric, old, new in rows(before, after):
+        change = (new - old) / old * 100 if old else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  worse"
+            regressions += 1
+        print(f"{name:<50}{metric:<22}{old:>10.2f}{new:>10.2f}{change:>8.1f}%{flag}")
+
+    print(f"\n{regressions} regressions over {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
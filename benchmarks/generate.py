@@ -0,0 +1,177 @@
+# benchmarks/generate.py
+"""
+Synthetic data generator for the benchmark and load-test scripts.
+
+Fills the configured database (DATABASE_URL or the DATABASE_* settings)
+with users, groups of skewed sizes and their expenses, then rebuilds the
+balance ledger from them:
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/generate.py \\
+        --users 50000 --groups 10000 --expenses 1000000 --manifest bench.json
+
+Group sizes follow a Pareto distribution (--skew; lower means a heavier
+tail), bigger groups get proportionally more expenses, and expenses are
+spread over the last --days days. Rows are only added, with ids after
+the current maximum, so point it at a scratch database. The manifest
+lists sample group ids and emails for benchmarks/micro.py and
+benchmarks/loadtest.py.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import func, insert, select
+
+# Only the sync engine is used here
+os.environ.setdefault("DATABASE_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger  # noqa: E402
+import models  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+from money import split_evenly  # noqa: E402
+
+# Rows per executemany
+BATCH_SIZE = 5000
+
+
+def next_id(conn, column):
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def group_sizes(rng, count, skew, max_size):
+    """Member counts with a long tail: mostly small groups, a few very large ones."""
+    return [min(max_size, int(2 * rng.paretovariate(skew))) for _ in range(count)]
+
+
+def insert_batched(conn, table, rows):
+    """Inserts an iterable of row dicts BATCH_SIZE at a time; returns how many were written."""
+    batch, written = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            conn.execute(insert(table), batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+        written += len(batch)
+    return written
+
+
+def generate(users, groups, expenses, skew, max_group_size, days, seed):
+    rng = random.Random(seed)
+    tag = uuid4().hex[:6]
+    models.Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        first_user = next_id(conn, models.User.id)
+        first_group = next_id(conn, models.Group.id)
+        first_expense = next_id(conn, models.Expense.id)
+
+        user_ids = range(first_user, first_user + users)
+        insert_batched(conn, models.User.__table__, (
+            {"id": user_id, "username": f"user-{tag}-{n}", "email": f"user-{tag}-{n}@example.com"}
+            for n, user_id in enumerate(user_ids)
+        ))
+
+        sizes = group_sizes(rng, groups, skew, min(max_group_size, users))
+        members = {
+            first_group + n: rng.sample(user_ids, size)
+            for n, size in enumerate(sizes)
+        }
+        insert_batched(conn, models.Group.__table__, (
+            {"id": group_id, "name": f"group-{tag}-{group_id - first_group}"} for group_id in members
+        ))
+        insert_batched(conn, models.group_members_table, (
+            {"group_id": group_id, "user_id": user_id}
+            for group_id, member_ids in members.items()
+            for user_id in member_ids
+        ))
+
+        group_ids = list(members)
+        # Expenses are spread evenly over the last `days` days, in id order
+        first_day = datetime.now() - timedelta(days=days)
+        seconds_apart = days * 86400 / max(expenses, 1)
+        expense_groups = rng.choices(group_ids, weights=sizes, k=expenses)
+        expense_rows = []
+        participant_rows = []
+        written = 0
+        for n, group_id in enumerate(expense_groups):
+            member_ids = members[group_id]
+            # Most expenses are shared by everyone; the rest by a random subset
+            if rng.random() < 0.7:
+                participants = member_ids
+            else:
+                participants = rng.sample(member_ids, rng.randint(1, len(member_ids)))
+            amount_cents = rng.randint(100, 50000)
+            expense_id = first_expense + n
+            expense_rows.append({
+                "id": expense_id, "description": f"expense {n}", "amount_cents": amount_cents,
+                "group_id": group_id, "paid_by_user_id": rng.choice(member_ids),
+                "created_at": first_day + timedelta(seconds=n * seconds_apart),
+            })
+            participant_rows.extend(
+                {"expense_id": expense_id, "user_id": user_id, "share_cents": share_cents}
+                for user_id, share_cents in zip(participants, split_evenly(amount_cents, len(participants)))
+            )
+            if len(expense_rows) == BATCH_SIZE:
+                conn.execute(insert(models.Expense), expense_rows)
+                conn.execute(insert(models.ExpenseParticipant), participant_rows)
+                written += len(expense_rows)
+                expense_rows, participant_rows = [], []
+                print(f"  {written} / {expenses} expenses", end="\r", flush=True)
+        if expense_rows:
+            conn.execute(insert(models.Expense), expense_rows)
+            conn.execute(insert(models.ExpenseParticipant), participant_rows)
+        print()
+
+    db = SessionLocal()
+    try:
+        ledger.rebuild(db)
+    finally:
+        db.close()
+
+    by_size = sorted(members, key=lambda group_id: len(members[group_id]))
+    return {
+        "tag": tag,
+        "users": users,
+        "groups": groups,
+        "expenses": expenses,
+        "largest_group_size": len(members[by_size[-1]]),
+        # Small, median and largest groups, for benchmarks that take a group id
+        "group_ids": [by_size[0], by_size[len(by_size) // 2], by_size[-1]],
+        "emails": [f"user-{tag}-{n}@example.com" for n in rng.sample(range(users), min(users, 20))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=1000)
+    parser.add_argument("--expenses", type=int, default=100000)
+    parser.add_argument("--skew", type=float, default=1.2, help="Pareto shape of the group sizes")
+    parser.add_argument("--max-group-size", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365, help="history the expenses are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--manifest", help="write sample ids and emails to this JSON file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = generate(args.users, args.groups, args.expenses, args.skew, args.max_group_size, args.days, args.seed)
+    print(f"generated {args.users} users, {args.groups} groups (largest {manifest['largest_group_size']}), "
+          f"{args.expenses} expenses in {time.perf_counter() - start:.1f}s")
+    if args.manifest:
+        with open(args.manifest, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
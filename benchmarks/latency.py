@@ -0,0 +1,96 @@
+# benchmarks/latency.py
+"""
+Concurrent load test reporting p50/p99 latency per endpoint.
+
+Start the API once per database mode and run the same load against each:
+
+    DATABASE_ASYNC=false uvicorn main:app --port 8000
+    python benchmarks/latency.py --label sync /groups/1/balances/ "/users/summary/?email=a@example.com"
+
+    DATABASE_ASYNC=true uvicorn main:app --port 8000
+    python benchmarks/latency.py --label async /groups/1/balances/ "/users/summary/?email=a@example.com"
+
+Requires httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+from dotenv import load_dotenv
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run(base_url, paths, total, concurrency):
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            for i in counter:
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+                res = await client.get(path)
+                elapsed = time.perf_counter() - start
+                if res.status_code == 200:
+                    latencies[path].append(elapsed)
+                else:
+                    failures[path] += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return latencies, failures, wall
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="request paths, requested round robin")
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL"))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    latencies, failures, wall = asyncio.run(run(args.base_url, args.paths, args.requests, args.concurrency))
+
+    results = {"label": args.label, "concurrency": args.concurrency, "rps": args.requests / wall, "endpoints": {}}
+    print(f"[{args.label}] {args.requests} requests at concurrency {args.concurrency}: {results['rps']:.1f} req/s")
+    print(f"{'path':<45}{'ok':>7}{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for path in args.paths:
+        samples = latencies[path]
+        stats = {
+            "ok": len(samples),
+            "failed": failures[path],
+            "p50_ms": percentile(samples, 50) * 1000 if samples else None,
+            "p99_ms": percentile(samples, 99) * 1000 if samples else None,
+            "mean_ms": statistics.fmean(samples) * 1000 if samples else None,
+        }
+        results["endpoints"][path] = stats
+        if samples:
+            print(f"{path:<45}{stats['ok']:>7}{stats['failed']:>8}{stats['p50_ms']:>10.1f}"
+                  f"{stats['p99_ms']:>10.1f}{stats['mean_ms']:>10.1f}")
+        else:
+            print(f"{path:<45}{0:>7}{stats['failed']:>8}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# benchmarks/ledger_io.py
+"""
+Throughput and peak memory of ledger imports and exports (ledger_io.py)
+on large files:
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/ledger_io.py \\
+        --manifest bench.json --rows 2000000 --format parquet --json ledger_io.json
+
+A synthetic ledger file of --rows participant rows is written for the
+largest group's members, imported into that group, and the group is
+exported again. Each phase runs in a fresh interpreter, so its peak RSS
+is its own; with constant-memory streaming it should not grow with
+--rows. Run it on a scratch copy of a database filled by
+benchmarks/generate.py: the imported expenses stay.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger_io  # noqa: E402
+from money import split_evenly  # noqa: E402
+
+
+def synthetic_rows(member_ids, rows, participants, seed):
+    """Ledger rows for expenses split evenly among `participants` random members, in expense order."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    expense_id = 0
+    while rows > 0:
+        expense_id += 1
+        amount = rng.randint(100, 50000)
+        users = sorted(rng.sample(member_ids, min(participants, len(member_ids), rows)))
+        created_at = start + timedelta(minutes=expense_id)
+        for user_id, share in zip(users, split_evenly(amount, len(users))):
+            yield (expense_id, created_at, f"expense {expense_id}", users[0], amount, user_id, share)
+        rows -= len(users)
+
+
+def write_file(path, file_format, rows):
+    """Writes rows to a ledger file CHUNK_SIZE rows at a time."""
+    if file_format == ledger_io.PARQUET:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(path, ledger_io.PARQUET_SCHEMA) as writer:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == ledger_io.CHUNK_SIZE:
+                    writer.write_table(pa.Table.from_pydict(dict(zip(ledger_io.COLUMNS, zip(*chunk))),
+                                                            schema=ledger_io.PARQUET_SCHEMA))
+                    chunk = []
+            if chunk:
+                writer.write_table(pa.Table.from_pydict(dict(zip(ledger_io.COLUMNS, zip(*chunk))),
+                                                        schema=ledger_io.PARQUET_SCHEMA))
+    else:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(ledger_io.COLUMNS)
+            writer.writerows((row[0], row[1].isoformat(), *row[2:]) for row in rows)
+
+
+def run_phase(phase, group_id, path, file_format):
+    """Runs in its own interpreter; prints the phase's seconds, bytes and peak RSS as JSON."""
+    from database import SessionLocal
+    import models
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        if phase == "import":
+            member_ids = {member.id for member in db.get(models.Group, group_id).members}
+            with open(path, "rb") as f:
+                summary = ledger_io.import_file(db, group_id, member_ids, f, file_format)
+            seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+            detail = {"imported": summary.imported, "skipped": summary.skipped}
+        else:
+            size = 0
+            for chunk in ledger_io.export(db, group_id, file_format):
+                size += len(chunk)
+            seconds = time.perf_counter() - start
+            # The export also holds the group's expenses from before the import
+            detail = {"rows": db.query(models.ExpenseParticipant).join(models.Expense).filter(
+                models.Expense.group_id == group_id
+            ).count()}
+    finally:
+        db.close()
+    print(json.dumps({
+        "seconds": seconds,
+        "bytes": size,
+        # Kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        **detail,
+    }))
+
+
+def measure(phase, group_id, path, file_format):
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--phase", phase, "--group-id", str(group_id),
+         "--path", path, "--format", file_format],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", help="JSON written by benchmarks/generate.py")
+    parser.add_argument("--rows", type=int, default=1000000, help="participant rows in the imported file")
+    parser.add_argument("--participants", type=int, default=4, help="participants per synthetic expense")
+    parser.add_argument("--format", choices=ledger_io.FORMATS, default=ledger_io.CSV)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    # Used by the per-phase subprocesses
+    parser.add_argument("--phase", choices=["import", "export"], help=argparse.SUPPRESS)
+    parser.add_argument("--group-id", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        run_phase(args.phase, args.group_id, args.path, args.format)
+        return
+    if not args.manifest:
+        parser.error("--manifest is required")
+
+    with open(args.manifest) as f:
+        group_id = json.load(f)["group_ids"][2]
+
+    from database import SessionLocal
+    import models
+    db = SessionLocal()
+    try:
+        member_ids = sorted(member.id for member in db.get(models.Group, group_id).members)
+    finally:
+        db.close()
+
+    results = {"label": args.label, "rows": args.rows, "format": args.format, "results": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"ledger.{args.format}")
+        write_file(path, args.format, synthetic_rows(member_ids, args.rows, args.participants, args.seed))
+        print(f"[{args.label}] {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB of {args.format}, group {group_id}")
+        print(f"{'phase':<10}{'seconds':>10}{'rows/s':>12}{'MB':>10}{'peak RSS MB':>14}")
+        for phase in ("import", "export"):
+            stats = measure(phase, group_id, path, args.format)
+            results["results"][phase] = stats
+            print(f"{phase:<10}{stats['seconds']:>10.1f}{stats.get('rows', args.rows) / stats['seconds']:>12.0f}"
+                  f"{stats['bytes'] / 1e6:>10.1f}{stats['peak_rss_mb']:>14.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
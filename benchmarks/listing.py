@@ -0,0 +1,104 @@
+# benchmarks/listing.py
+"""
+Latency of GET /users/ and GET /groups as the tables grow.
+
+Inserts users (and one group of five members per ten users) straight into
+the configured database in steps, and after each step times the listing
+endpoints of a live API running on that same database. Keyset pages and
+prefix searches should stay flat while the row counts climb:
+
+    uvicorn main:app --port 8000
+    python benchmarks/listing.py --sizes 1000 10000 100000 200000
+
+Rows are only ever added, so point both at a scratch database.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from uuid import uuid4
+
+import requests
+from dotenv import load_dotenv
+from sqlalchemy import func, insert, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: E402
+from database import engine  # noqa: E402
+
+INSERT_BATCH = 5000
+MEMBERS_PER_GROUP = 5
+
+
+def grow(tag, start, stop):
+    """Adds users start..stop-1, and a group for every tenth of them."""
+    with engine.begin() as conn:
+        for lo in range(start, stop, INSERT_BATCH):
+            hi = min(lo + INSERT_BATCH, stop)
+            conn.execute(insert(models.User), [
+                {"username": f"{tag}-{i:07d}", "email": f"{tag}-{i}@bench.example"} for i in range(lo, hi)
+            ])
+            user_ids = conn.execute(
+                select(models.User.id).where(models.User.username.startswith(f"{tag}-")).order_by(models.User.id.desc())
+                .limit(hi - lo)
+            ).scalars().all()
+            groups = [{"name": f"{tag}-group-{i:07d}"} for i in range(lo // 10, hi // 10)]
+            if not groups:
+                continue
+            conn.execute(insert(models.Group), groups)
+            group_ids = conn.execute(
+                select(models.Group.id).order_by(models.Group.id.desc()).limit(len(groups))
+            ).scalars().all()
+            conn.execute(insert(models.group_members_table), [
+                {"group_id": group_id, "user_id": user_ids[(n * MEMBERS_PER_GROUP + k) % len(user_ids)]}
+                for n, group_id in enumerate(group_ids)
+                for k in range(MEMBERS_PER_GROUP)
+            ])
+
+
+def time_get(session, url, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = session.get(url, params=params)
+        samples.append(time.perf_counter() - start)
+        res.raise_for_status()
+    return statistics.median(samples) * 1000
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=30, help="requests per measurement; the median is shown")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    tag = f"bench{uuid4().hex[:6]}"
+    session = requests.Session()
+    cases = [
+        ("users first page", "/users/", lambda top: {"limit": 100}),
+        ("users deep page", "/users/", lambda top: {"limit": 100, "after_id": top["user"] - 150}),
+        ("users prefix", "/users/", lambda top: {"limit": 100, "q": f"{tag}-000120"}),
+        ("groups page", "/groups", lambda top: {"limit": 100}),
+        ("groups + members", "/groups", lambda top: {"limit": 100, "include_members": "true"}),
+        ("groups prefix", "/groups", lambda top: {"limit": 100, "q": f"{tag}-group-00012"}),
+    ]
+
+    print(f"{'users':>9}  " + "".join(f"{name:>18}" for name, _, _ in cases) + "   (median ms)")
+    grown = 0
+    for size in sorted(args.sizes):
+        grow(tag, grown, size)
+        grown = size
+        with engine.connect() as conn:
+            top = {"user": conn.execute(select(func.max(models.User.id))).scalar()}
+        row = [time_get(session, f"{args.base_url}{path}", params(top), args.repeat) for _, path, params in cases]
+        print(f"{size:>9}  " + "".join(f"{ms:>18.1f}" for ms in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/loadtest.py
+"""
+Load test that replays the Streamlit app's traffic against a live API.
+
+Each virtual user picks a page by weight and makes the calls app.py
+makes for it, through a shared keep-alive client:
+
+    View Summary   summary, batched settlement plans, and sometimes the expense
+                   page of one group whose history is opened
+    Add Expense    group search with members, then a new expense
+    Create Group   user search
+    Create User    a new user
+
+    python benchmarks/loadtest.py --manifest bench.json --duration 60 \\
+        --users 50 --json load.json --label baseline
+
+Latency is reported per page view and per endpoint. The API should run
+on a database filled by benchmarks/generate.py; expenses and users are
+really created. Requires httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+import httpx
+from dotenv import load_dotenv
+
+from latency import percentile
+
+# Page views per 100, roughly what the dashboard sees
+PAGE_WEIGHTS = {
+    "View Summary": 60,
+    "Add Expense": 25,
+    "Create Group": 12,
+    "Create User": 3,
+}
+# Share of summary views that go on to open one group's expense history;
+# app.py only fetches a history when its toggle is turned on
+HISTORY_OPENS = 0.3
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.failures = defaultdict(int)
+
+    async def call(self, client, name, method, path, **kwargs):
+        start = time.perf_counter()
+        res = await client.request(method, path, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if res.status_code >= 400:
+            self.failures[name] += 1
+            return None
+        return res.json()
+
+
+async def view_summary(client, rec, manifest, rng):
+    summary = await rec.call(client, "GET /users/summary/", "GET", "/users/summary/",
+                             params={"email": rng.choice(manifest["emails"])})
+    if not summary or not summary["groups"]:
+        return
+    group_ids = [group["group_id"] for group in summary["groups"]]
+    await rec.call(client, "GET /groups/balances", "GET", "/groups/balances",
+                   params={"ids": group_ids[:100], "include_settlements": "true"})
+    if rng.random() < HISTORY_OPENS:
+        # The rerun reuses the summary kept in session state, so this is its only call
+        await rec.call(client, "GET /groups/{id}/expenses/", "GET", f"/groups/{rng.choice(group_ids)}/expenses/",
+                       params={"limit": 50})
+
+
+async def add_expense(client, rec, manifest, rng):
+    page = await rec.call(client, "GET /groups", "GET", "/groups",
+                          params={"q": f"group-{manifest['tag']}-{rng.randint(1, 9)}", "limit": 100,
+                                  "include_members": "true"})
+    groups = [group for group in (page or {}).get("items", []) if group["members"]]
+    if not groups:
+        return
+    group = rng.choice(groups)
+    member_ids = [member["id"] for member in group["members"]]
+    # Keyed like the gateway's retryable writes, so the key lookup is part of the measured cost
+    await rec.call(client, "POST /groups/{id}/expenses/", "POST", f"/groups/{group['id']}/expenses/", json={
+        "description": "load test", "amount": round(rng.uniform(1, 500), 2),
+        "paid_by_user_id": rng.choice(member_ids), "participant_user_ids": member_ids,
+    }, headers={"Idempotency-Key": uuid4().hex})
+
+
+async def create_group(client, rec, manifest, rng):
+    await rec.call(client, "GET /users/", "GET", "/users/",
+                   params={"q": f"user-{manifest['tag']}-{rng.randint(1, 9)}", "limit": 100})
+
+
+async def create_user(client, rec, manifest, rng):
+    name = f"load-{uuid4().hex[:12]}"
+    await rec.call(client, "POST /users/", "POST", "/users/", json={"username": name, "email": f"{name}@example.com"})
+
+
+PAGES = {
+    "View Summary": view_summary,
+    "Add Expense": add_expense,
+    "Create Group": create_group,
+    "Create User": create_user,
+}
+
+
+async def run(base_url, manifest, users, duration, seed):
+    rec = Recorder()
+    pages = defaultdict(list)
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def virtual_user(n):
+            rng = random.Random(seed + n)
+            names, weights = list(PAGE_WEIGHTS), list(PAGE_WEIGHTS.values())
+            while time.perf_counter() < deadline:
+                page = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                await PAGES[page](client, rec, manifest, rng)
+                pages[page].append(time.perf_counter() - start)
+
+        await asyncio.gather(*(virtual_user(n) for n in range(users)))
+    return pages, rec
+
+
+def summarize(samples, failed=0):
+    return {
+        "count": len(samples),
+        "failed": failed,
+        "p50_ms": percentile(samples, 50) * 1000 if samples else None,
+        "p99_ms": percentile(samples, 99) * 1000 if samples else None,
+    }
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL"))
+    parser.add_argument("--manifest", required=True, help="JSON written by benchmarks/generate.py")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    pages, rec = asyncio.run(run(args.base_url, manifest, args.users, args.duration, args.seed))
+
+    views = sum(len(samples) for samples in pages.values())
+    results = {
+        "label": args.label,
+        "users": args.users,
+        "duration_s": args.duration,
+        "page_views_per_s": views / args.duration,
+        "pages": {page: summarize(samples) for page, samples in pages.items()},
+        "endpoints": {name: summarize(samples, rec.failures[name]) for name, samples in rec.latencies.items()},
+    }
+
+    print(f"[{args.label}] {views} page views by {args.users} users: {results['page_views_per_s']:.1f}/s")
+    for section in ("pages", "endpoints"):
+        print(f"\n{section[:-1]:<32}{'count':>8}{'failed':>8}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, stats in sorted(results[section].items()):
+            print(f"{name:<32}{stats['count']:>8}{stats['failed']:>8}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
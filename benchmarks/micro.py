@@ -0,0 +1,133 @@
+# benchmarks/micro.py
+"""
+Microbenchmarks of the API's hot paths, run in-process against the
+configured database, typically one filled by benchmarks/generate.py:
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/micro.py \\
+        --manifest bench.json --json micro.json --label baseline
+
+Each case calls the function behind an endpoint directly with a fresh
+session, bypassing HTTP and the read cache, and reports latency
+percentiles and the SQL statements issued per call. A jump in
+statements per call is the usual sign of a new N+1 query.
+
+create_expense writes real rows; use a scratch database. The same cases
+run under pytest-benchmark in tests/test_micro.py.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Plain sessions, so every statement goes through the engine we count on
+os.environ.setdefault("DATABASE_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event  # noqa: E402
+
+import main as api  # noqa: E402
+import schemas  # noqa: E402
+import settlements  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+
+_statements = [0]
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count(*_):
+    _statements[0] += 1
+
+
+def measure(fn, repeat, warmup=3):
+    """Runs fn(db) on a fresh session per call; returns latency and statement stats."""
+    for _ in range(warmup):
+        db = SessionLocal()
+        try:
+            fn(db)
+        finally:
+            db.close()
+
+    samples = []
+    _statements[0] = 0
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            fn(db)
+            samples.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    return {
+        "calls": repeat,
+        "p50_ms": statistics.median(samples) * 1000,
+        "p99_ms": statistics.quantiles(samples, n=100)[98] * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "statements_per_call": _statements[0] / repeat,
+    }
+
+
+def cases(manifest):
+    _, median, largest = manifest["group_ids"]
+    emails = manifest["emails"]
+    members = {}
+    db = SessionLocal()
+    try:
+        for group_id in (median, largest):
+            members[group_id] = [user_id for user_id, _, _ in api._member_balances(db, group_id)]
+        balances = {user_id: net for user_id, _, net in api._member_balances(db, largest)}
+    finally:
+        db.close()
+
+    def new_expense(group_id):
+        return schemas.ExpenseCreate(
+            description="micro benchmark", amount=12.34,
+            paid_by_user_id=members[group_id][0], participant_user_ids=members[group_id],
+        )
+
+    calls = iter(range(10 ** 9))
+    return [
+        ("group_balances median group", lambda db: api._group_balances(db, median)),
+        ("group_balances largest group", lambda db: api._group_balances(db, largest)),
+        ("user_summary", lambda db: api._user_summary(
+            db, api._get_user_by_email_or_404(db, emails[next(calls) % len(emails)]))),
+        ("create_expense median group", lambda db: api._create_expense(db, median, new_expense(median))),
+        ("expense page largest group", lambda db: api._list_group_expenses(db, largest, 0, 50)),
+        ("monthly report largest group", lambda db: api._group_report(largest, "month", None, None)),
+        # The plan cache would turn repeated runs into lookups, so clear it first
+        ("settlement greedy largest group",
+         lambda db: (settlements._cached_plan.cache_clear(), settlements.plan(balances, settlements.GREEDY))),
+        ("settlement minimal largest group",
+         lambda db: (settlements._cached_plan.cache_clear(), settlements.plan(balances, settlements.MINIMAL))),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", required=True, help="JSON written by benchmarks/generate.py")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    results = {"label": args.label, "database": engine.dialect.name, "data": manifest, "results": {}}
+    print(f"{'case':<36}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'stmts':>8}")
+    for name, fn in cases(manifest):
+        stats = measure(fn, args.repeat)
+        results["results"][name] = stats
+        print(f"{name:<36}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+              f"{stats['mean_ms']:>10.2f}{stats['statements_per_call']:>8.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
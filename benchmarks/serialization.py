@@ -0,0 +1,127 @@
+# benchmarks/serialization.py
+"""
+CPU time and size of the large responses under each encoding:
+
+    before     the previous path: pydantic models built from the rows,
+               validated again against the route's response_model, then
+               dumped to JSON; for cached bodies, the standard library
+               encoder JSONResponse used
+    json       plain dicts built from the rows, encoded by encoding.py
+               (orjson when installed)
+    msgpack    the same dicts as MessagePack (Accept: application/msgpack)
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/serialization.py \\
+        --manifest bench.json --json serialization.json --label baseline
+
+Rows are loaded once per case, so only building and encoding the body is
+timed, with time.process_time. Run it on a database filled by
+benchmarks/generate.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+import encoding  # noqa: E402
+import main as api  # noqa: E402
+import schemas  # noqa: E402
+from database import SessionLocal  # noqa: E402
+
+
+def cpu_ms(fn, repeat):
+    """Mean CPU milliseconds per call."""
+    fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def pydantic_path(response_model, build):
+    """What FastAPI does with a returned model: validate it against response_model, then dump JSON."""
+    adapter = TypeAdapter(response_model)
+    return lambda: adapter.dump_json(adapter.validate_python(build(), from_attributes=True))
+
+
+def cases(db, manifest):
+    _, _, largest = manifest["group_ids"]
+    # The email in the most groups has the largest summary
+    summaries = [api._user_summary(db, api._get_user_by_email_or_404(db, email)) for email in manifest["emails"]]
+    summary = max(summaries, key=lambda s: len(s.groups))
+    report = encoding.jsonable(api._group_report(largest, "month", None, None))
+
+    result = []
+    for limit in (50, 500):
+        expenses = api._expense_page(db, largest, 0, limit)
+
+        def old_page(expenses=expenses):
+            return schemas.ExpensePage(items=[schemas.ExpenseDetail.model_validate(exp) for exp in expenses])
+
+        def page(expenses=expenses):
+            return {"items": [api._expense_item(exp) for exp in expenses], "next_cursor": None}
+
+        result.append((f"expense page of {limit} largest group", pydantic_path(schemas.ExpensePage, old_page), page))
+
+    result.append((
+        f"user summary ({len(summary.groups)} groups)",
+        pydantic_path(schemas.UserSummary, lambda: schemas.UserSummary(**summary.model_dump())),
+        lambda: encoding.jsonable(summary),
+    ))
+    # Cached bodies are already plain data; only encoding them is left per hit
+    result.append((
+        "cached monthly report largest group",
+        lambda: json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode(),
+        lambda: report,
+    ))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", required=True, help="JSON written by benchmarks/generate.py")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+
+    encoders: List[tuple] = [("json", encoding.dumps_json)]
+    if encoding.msgpack is not None:
+        encoders.append(("msgpack", encoding.dumps_msgpack))
+
+    results = {
+        "label": args.label,
+        "json_encoder": "orjson" if encoding.orjson is not None else "json",
+        "results": {},
+    }
+    print(f"{'case':<44}{'encoding':<10}{'cpu ms':>10}{'bytes':>12}")
+    db = SessionLocal()
+    try:
+        for name, baseline, build in cases(db, manifest):
+            timings = [("before", cpu_ms(baseline, args.repeat), len(baseline()))]
+            for encoder_name, dumps in encoders:
+                timings.append((encoder_name, cpu_ms(lambda: dumps(build()), args.repeat), len(dumps(build()))))
+            for encoder_name, ms, size in timings:
+                results["results"][f"{name} [{encoder_name}]"] = {"cpu_ms": ms, "bytes": size}
+                print(f"{name:<44}{encoder_name:<10}{ms:>10.2f}{size:>12}")
+    finally:
+        db.close()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# benchmarks/settlements.py
+"""
+Timing and transfer counts for the settlement modes on synthetic groups.
+
+Needs no database:
+
+    python benchmarks/settlements.py --sizes 10 15 50 100 300 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import settlements  # noqa: E402
+
+
+def random_balances(size, rng):
+    """Net balances in cents that sum to zero, with a share of members already settled."""
+    amounts = [rng.choice([0, rng.randint(-50000, 50000)]) for _ in range(size - 1)]
+    amounts.append(-sum(amounts))
+    return {member: amount for member, amount in enumerate(amounts) if amount}
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 10, 15, 50, 100, 200, 300, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"{'members':>8}{'open':>6}{'greedy ms':>11}{'transfers':>11}{'minimal ms':>12}{'transfers':>11}{'optimal':>9}")
+    for size in args.sizes:
+        balances = random_balances(size, rng)
+        greedy_time, greedy = best_of(args.repeat, settlements.greedy, balances)
+        minimal_time, plan = best_of(args.repeat, settlements.minimal, balances)
+        print(
+            f"{size:>8}{len(balances):>6}{greedy_time * 1000:>11.2f}{len(greedy):>11}"
+            f"{minimal_time * 1000:>12.2f}{len(plan.transfers):>11}{str(plan.optimal):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/snapshots.py
+"""
+Recomputing balances from the whole history versus from the balance
+snapshots plus the expenses after their watermark.
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/snapshots.py \\
+        --manifest bench.json --tail 1000 --json snapshots.json --label baseline
+
+The snapshots are rebuilt to leave the newest --tail expenses after the
+watermark, as compaction would between two runs. Then ledger.py's
+recompute (what verify and rebuild read) is timed both ways for the
+largest group and for every group, and the two results are compared.
+Run it on a copy of a database filled by benchmarks/generate.py: it
+rewrites the snapshot table.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_ASYNC", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func  # noqa: E402
+
+import ledger  # noqa: E402
+import models  # noqa: E402
+import snapshots  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from latency import percentile  # noqa: E402
+
+
+def timed(repeat, fn, *args):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifest", required=True, help="JSON written by benchmarks/generate.py")
+    parser.add_argument("--tail", type=int, default=1000, help="expenses left after the watermark")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    largest = manifest["group_ids"][2]
+
+    results = {"label": args.label, "tail": args.tail, "results": {}}
+    db = SessionLocal()
+    try:
+        models.Base.metadata.create_all(bind=db.get_bind())
+        last_id = db.scalar(func.max(models.Expense.id).select()) or 0
+        snapshots.rebuild(db, through_id=max(0, last_id - args.tail))
+
+        print(f"{'case':<28}{'method':<12}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, group_id in ((f"largest group ({largest})", largest), ("all groups", None)):
+            computed = {}
+            for method, full in (("full", True), ("snapshot", False)):
+                samples, computed[method] = timed(args.repeat, ledger.compute_totals, db, group_id, full)
+                stats = {"p50_ms": percentile(samples, 50) * 1000, "p99_ms": percentile(samples, 99) * 1000}
+                results["results"][f"{name} [{method}]"] = stats
+                print(f"{name:<28}{method:<12}{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+            if computed["full"] != computed["snapshot"]:
+                print(f"{name}: snapshot totals differ from the full recompute")
+                return 1
+    finally:
+        db.close()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# cache.py
+"""
+Versioned read cache for balances, settlements and user summaries.
+
+Every cached value is filed under a scope ("group:3", "user:7")
+and that scope's current version token. Writes bump the versions of the
+scopes they affect, so stale entries are never read again and simply age
+out. The token doubles as the ETag, which lets a client revalidate with
+If-None-Match without the server touching the database.
+
+The default backend is a bounded in-process LRU with a TTL. With several
+workers, set CACHE_URL=redis://... so versions and values are shared;
+otherwise a worker that did not handle a write serves its old entries
+until they expire.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from time import monotonic, time
+from typing import Any, Optional
+from uuid import uuid4
+
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+
+
+class LRUBackend:
+    """In-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Endpoints read the cache from worker threads as well as the event loop
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Shared backend for multi-worker deployments. Values must be JSON-serializable."""
+
+    def __init__(self, url: str, ttl: int = CACHE_TTL):
+        import redis  # Only needed when CACHE_URL points at Redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self.client.set(key, json.dumps(value), ex=self.ttl)
+
+
+_backend = RedisBackend(CACHE_URL) if CACHE_URL.startswith("redis") else LRUBackend()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def configure(backend) -> None:
+    """Swaps in another backend: any object with get(key) and set(key, value)."""
+    global _backend
+    _backend = backend
+
+
+def _token(bumped_at: float) -> str:
+    # A random part, not a counter, so a restarted worker or an evicted
+    # version can never reissue a token a client already holds. The prefix
+    # records when the scope last changed, in milliseconds.
+    return f"{int(bumped_at * 1000):x}-{uuid4().hex[:12]}"
+
+
+def version(scope: str) -> str:
+    """The scope's current version token, minting one if it has none yet."""
+    token = _backend.get(f"version:{scope}")
+    if token is None:
+        # Nothing is known about when the scope last changed
+        token = _token(0)
+        _backend.set(f"version:{scope}", token)
+    return token
+
+
+def changed_within(scope_version: str, seconds: float) -> bool:
+    """Whether the scope was bumped less than `seconds` ago, going by its version token."""
+    bumped_at, _, _ = scope_version.partition("-")
+    try:
+        return time() - int(bumped_at, 16) / 1000 < seconds
+    except ValueError:
+        # A token from before the change time was recorded
+        return False
+
+
+def bump(*scopes: str) -> None:
+    """Invalidates everything cached under these scopes."""
+    for scope in scopes:
+        _backend.set(f"version:{scope}", _token(time()))
+
+
+def lookup(name: str, scope: str, scope_version: str) -> Optional[Any]:
+    value = _backend.get(f"{name}:{scope}:{scope_version}")
+    _stats["hits" if value is not None else "misses"] += 1
+    return value
+
+
+def store(name: str, scope: str, scope_version: str, value: Any) -> None:
+    _backend.set(f"{name}:{scope}:{scope_version}", value)
+
+
+def record_not_modified() -> None:
+    _stats["not_modified"] += 1
+
+
+def render_metrics() -> str:
+    """Hit/miss counters in the Prometheus text exposition format."""
+    lines = [
+        "# HELP cache_requests_total Cache lookups by outcome; not_modified answered a conditional request.",
+        "# TYPE cache_requests_total counter",
+    ]
+    for outcome, count in _stats.items():
+        lines.append(f'cache_requests_total{{outcome="{outcome}"}} {count}')
+    return "\n".join(lines) + "\n"
@@ -1,8 +1,16 @@
+import itertools
 import os
+import threading
+import time
+from typing import List, Optional
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
 
 # Load environment variables from the .env file
 load_dotenv()
@@ -16,21 +24,279 @@ DB_NAME = os.getenv("DATABASE_NAME")
 
 # The database connection string for MySQL.
 # The format is: "mysql+pymysql://<user>:<password>@<host>:<port>/<dbname>"
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# A full URL in DATABASE_URL takes precedence, e.g. sqlite:///bench.db for a
+# local benchmark database.
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection pool settings, shared by the sync and async engines.
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+    # Recycle connections before MySQL's wait_timeout drops them
+    "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true",
+}
+
+
+
+def _connect_args(url: str) -> dict:
+    # SQLite connections are shared with threadpool workers
+    return {"check_same_thread": False} if make_url(url).get_backend_name() == "sqlite" else {}
+
+
+CONNECT_ARGS = _connect_args(DATABASE_URL)
+
+# --- Async engine settings ---
+# Hot endpoints take their session from get_async_db. With DATABASE_ASYNC on
+# (the default) they await MySQL through aiomysql or asyncmy instead of
+# holding a threadpool worker for the whole request.
+USE_ASYNC_DB = os.getenv("DATABASE_ASYNC", "true").lower() == "true"
+ASYNC_DRIVER = os.getenv("DATABASE_ASYNC_DRIVER", "aiomysql")  # or "asyncmy"
+
+
+def _async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername="sqlite+aiosqlite" if url.get_backend_name() == "sqlite" else f"mysql+{ASYNC_DRIVER}")
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+
+# --- Read replicas ---
+# Heavy read-only routes use a replica when DATABASE_REPLICA_URLS lists any
+# (comma-separated URLs of the same backend as the primary), round-robin.
+# A client that just wrote reads from the primary for READ_YOUR_WRITES_SECONDS,
+# tracked with a cookie set on every successful write; keep the window above
+# the replicas' worst lag.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "db_primary_until"
+
+# --- Lazy engines ---
+# Engines (and the database drivers they load) are only created on first
+# use, so importing the app opens nothing. A server that preloads the app
+# and forks workers therefore hands each worker a clean slate instead of
+# pool connections shared across processes. `database.engine` and
+# `database.async_engine` still work as attributes; assigning them (as
+# tests and tools do) replaces the lazily created engine.
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    engine = globals().get("engine")
+    if engine is None:
+        with _engine_lock:
+            engine = globals().get("engine")
+            if engine is None:
+                engine = create_engine(DATABASE_URL, connect_args=CONNECT_ARGS, **POOL_SETTINGS)
+                globals()["engine"] = engine
+    return engine
+
+
+def get_async_engine() -> Optional[AsyncEngine]:
+    if not USE_ASYNC_DB:
+        return None
+    async_engine = globals().get("async_engine")
+    if async_engine is None:
+        with _engine_lock:
+            async_engine = globals().get("async_engine")
+            if async_engine is None:
+                async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=CONNECT_ARGS, **POOL_SETTINGS)
+                globals()["async_engine"] = async_engine
+    return async_engine
+
+
+def _replica_engines() -> List[Engine]:
+    engines = globals().get("replica_engines")
+    if engines is None:
+        with _engine_lock:
+            engines = globals().get("replica_engines")
+            if engines is None:
+                engines = [
+                    create_engine(url, connect_args=_connect_args(url), **POOL_SETTINGS) for url in DATABASE_REPLICA_URLS
+                ]
+                globals()["replica_engines"] = engines
+                globals()["_next_replica"] = itertools.cycle(range(len(engines)))
+    return engines
+
+
+def _async_replica_engines() -> List[AsyncEngine]:
+    engines = globals().get("async_replica_engines")
+    if engines is None:
+        with _engine_lock:
+            engines = globals().get("async_replica_engines")
+            if engines is None:
+                engines = [
+                    create_async_engine(_async_url(url), connect_args=_connect_args(url), **POOL_SETTINGS)
+                    for url in DATABASE_REPLICA_URLS
+                ]
+                globals()["async_replica_engines"] = engines
+    return engines
+
+
+def _pick_replica() -> int:
+    _replica_engines()
+    with _engine_lock:
+        return next(_next_replica)
+
+
+def __getattr__(name):
+    # Module attribute hook (PEP 562): creates an engine when it is first read
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def dispose_engines() -> None:
+    """Closes the pools of the engines created so far; called when a worker shuts down."""
+    engine = globals().get("engine")
+    if engine is not None:
+        engine.dispose()
+    async_engine = globals().get("async_engine")
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in globals().get("replica_engines", ()):
+        replica.dispose()
+    for replica in globals().get("async_replica_engines", ()):
+        await replica.dispose()
+
+
+class _LazySessionmaker(sessionmaker):
+    """A sessionmaker that binds to the engine on its first session, unless a bind was configured."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and local_kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and local_kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
 
-# The create_engine is the starting point for any SQLAlchemy application.
-engine = create_engine(DATABASE_URL)
 
 # Each instance of the SessionLocal class will be a new database session.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(autoflush=False, expire_on_commit=False)
 
 # Base class for our models to inherit from.
 Base = declarative_base()
 
+
+def missing_tables() -> List[str]:
+    """Tables of the imported models that the database lacks; `python migrate.py` creates them."""
+    existing = set(inspect(get_engine()).get_table_names())
+    return [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+
 # Dependency to get a DB session for each request
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency for the async endpoints. Yields an AsyncSession, or a plain
+# Session when DATABASE_ASYNC is off so both modes can be compared.
+async def get_async_db():
+    if get_async_engine() is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# --- Read-only sessions ---
+def use_replica(request: Request) -> bool:
+    """Whether a read-only request may go to a replica: replicas exist and the client has not written recently."""
+    if not DATABASE_REPLICA_URLS:
+        return False
+    until = request.cookies.get(READ_PRIMARY_COOKIE)
+    if until is None:
+        return True
+    try:
+        return float(until) < time.time()
+    except ValueError:
+        return False
+
+
+def read_session(request: Request) -> Session:
+    """A session for a read-only request, for code that opens its own (streams, reports)."""
+    if not use_replica(request):
+        return SessionLocal()
+    db = SessionLocal(bind=_replica_engines()[_pick_replica()])
+    db.info["replica"] = True
+    return db
+
+
+# Dependencies for read-only routes: like get_db and get_async_db, but on a replica when one can serve the request
+def get_read_db(request: Request):
+    db = read_session(request)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    if get_async_engine() is None:
+        db = read_session(request)
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+        return
+
+    if not use_replica(request):
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    async with AsyncSessionLocal(bind=_async_replica_engines()[_pick_replica()]) as db:
+        db.info["replica"] = True
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware that marks a client as having just written: every
+    successful write sets a cookie that keeps its reads on the primary for
+    READ_YOUR_WRITES_SECONDS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS") or not DATABASE_REPLICA_URLS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{READ_PRIMARY_COOKIE}={until:.3f}; Max-Age={int(READ_YOUR_WRITES_SECONDS) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+# Runs fn(session, *args) against either kind of session. ORM code runs
+# unchanged on the async session's greenlet, so no worker thread is held
+# while waiting on the database; a sync session uses the threadpool.
+async def run_db(db, fn, *args):
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
@@ -0,0 +1,90 @@
+# encoding.py
+"""
+Fast response encoding for the large read endpoints.
+
+Handlers on these paths build plain dicts and lists from rows they have
+just read, which are trusted, and hand them to `render`. It returns a
+Response directly, so FastAPI neither validates the body again against
+the route's response_model (which then only documents the schema) nor
+walks it with jsonable_encoder.
+
+JSON is encoded with orjson when it is installed, else with the standard
+library. A client sending `Accept: application/msgpack` gets the same
+body as MessagePack when msgpack is installed; responses carry
+`Vary: Accept` so HTTP caches keep the two apart. Bodies must be
+JSON-native (str, int, float, bool, None, lists and dicts).
+"""
+
+import json
+from typing import Any, Mapping, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:  # Optional: the standard library encoder is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: without it every client gets JSON
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+# Also sent by older MessagePack clients
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+
+def dumps_json(content: Any) -> bytes:
+    if orjson is not None:
+        # jsonable_encoder leaves int dict keys as they are; the standard encoder accepts them too
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, use_bin_type=True)
+
+
+class FastJSONResponse(Response):
+    media_type = JSON
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return dumps_msgpack(content)
+
+
+def wants_msgpack(request: Request) -> bool:
+    """Whether the client accepts MessagePack and the server can produce it."""
+    if msgpack is None:
+        return False
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        if media_type in MSGPACK_TYPES:
+            return "q=0" not in params
+    return False
+
+
+def jsonable(value: Any) -> Any:
+    """JSON-native form of a handler's result; pydantic models are dumped in one pass by pydantic-core."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, list) and value and isinstance(value[0], BaseModel):
+        return [item.model_dump(mode="json") for item in value]
+    return jsonable_encoder(value)
+
+
+def render(request: Request, content: Any, status_code: int = 200,
+           headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Encodes a JSON-native body in the representation the client asked for."""
+    response_class = MsgPackResponse if wants_msgpack(request) else FastJSONResponse
+    return response_class(content, status_code=status_code, headers={"Vary": "Accept", **(headers or {})})
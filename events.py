@@ -0,0 +1,145 @@
+# events.py
+"""
+Publish/subscribe fan-out for the balance change feed.
+
+Expense writes publish one message per committed transaction on their
+group's channel; GET /groups/{group_id}/events relays them to each
+connected client as Server-Sent Events.
+
+The default broker lives in the API process: every subscriber gets a
+bounded asyncio.Queue, and publishing from a worker thread hands the
+message to the subscriber's event loop. A subscriber that falls
+QUEUE_SIZE messages behind has its backlog replaced by RESYNC, so it
+reloads the balances instead of blocking writers. With several workers,
+set EVENTS_URL=redis://... so a write made in one worker reaches clients
+connected to another.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Optional, Set
+
+EVENTS_URL = os.getenv("EVENTS_URL", "")
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Seconds of silence after which the stream sends a comment to keep proxies from closing it
+KEEPALIVE_SECONDS = 15
+
+# Delivered instead of the messages a slow subscriber missed
+RESYNC = object()
+
+
+def channel(group_id: int) -> str:
+    return f"group-events:{group_id}"
+
+
+class LocalSubscription:
+    def __init__(self, broker: "LocalBroker", channel: str):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def offer(self, message: str) -> None:
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout: float):
+        """The next message, RESYNC, or None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process fan-out; publish() may be called from any thread."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[LocalSubscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            subscribers = tuple(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                self.unsubscribe(subscription)
+
+    async def subscribe(self, channel: str) -> LocalSubscription:
+        subscription = LocalSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LocalSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[str]:
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return None if message is None else message["data"].decode()
+
+    async def close(self) -> None:
+        await self.pubsub.aclose()
+
+
+class RedisBroker:
+    """Shared broker for multi-worker deployments, on Redis pub/sub."""
+
+    def __init__(self, url: str):
+        import redis  # Only needed when EVENTS_URL points at Redis
+        import redis.asyncio
+
+        self.client = redis.Redis.from_url(url)
+        self.async_client = redis.asyncio.Redis.from_url(url)
+
+    def publish(self, channel: str, message: str) -> None:
+        self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> RedisSubscription:
+        pubsub = self.async_client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(pubsub)
+
+
+_broker = RedisBroker(EVENTS_URL) if EVENTS_URL.startswith("redis") else LocalBroker()
+
+
+def configure(broker) -> None:
+    """Swaps in another broker: any object with publish(channel, message) and async subscribe(channel)."""
+    global _broker
+    _broker = broker
+
+
+def publish(group_id: int, message: str) -> None:
+    _broker.publish(channel(group_id), message)
+
+
+async def subscribe(group_id: int):
+    """A subscription to a group's feed; messages published from now on are delivered."""
+    return await _broker.subscribe(channel(group_id))
+
+
+def sse(event: str, data: str) -> str:
+    """Formats one Server-Sent Event whose data is a single line of JSON."""
+    return f"event: {event}\ndata: {data}\n\n"
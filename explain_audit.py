@@ -0,0 +1,150 @@
+# explain_audit.py
+"""
+Index audit for the API's queries.
+
+Calls the main.py endpoints in-process against the configured database,
+records every statement they issue, and runs EXPLAIN on each one. It fails
+when a statement has to scan a whole table because no index can serve it.
+
+    python explain_audit.py --group-id 1 --email alice@example.com
+
+Writes made by the POST endpoints are rolled back. Run it against a copy of
+production-sized data: on tiny tables MySQL prefers a scan even when an
+index exists, and such scans are only reported as warnings.
+"""
+
+import argparse
+import os
+import sys
+
+# Use plain sessions so every query goes through the connection we watch
+os.environ["DATABASE_ASYNC"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+import models  # noqa: E402
+
+# Statements EXPLAIN can describe
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+
+def build_requests(db, group_id, email):
+    """The (method, path, kwargs) calls to audit, filled in from real rows."""
+    group = db.get(models.Group, group_id)
+    if group is None or not group.members:
+        raise SystemExit(f"Group {group_id} not found or has no members")
+    member_ids = [member.id for member in group.members]
+
+    return [
+        ("GET", "/users/", {"params": {"limit": 100}}),
+        ("GET", "/users/", {"params": {"q": group.members[0].username[:2]}}),
+        ("GET", "/groups", {"params": {"limit": 100}}),
+        ("GET", "/groups", {"params": {"q": group.name[:2], "include_members": "true"}}),
+        ("GET", "/users/summary/", {"params": {"email": email}}),
+        ("GET", f"/groups/{group_id}/balances/", {}),
+        ("GET", f"/groups/{group_id}/settlements", {}),
+        ("GET", "/groups/balances", {"params": {"ids": [group_id], "include_settlements": "true"}}),
+        ("GET", f"/groups/{group_id}/report", {"params": {"bucket": "week", "start": "2020-01-01"}}),
+        ("GET", f"/groups/{group_id}/expenses/", {"params": {"limit": 50}}),
+        ("POST", f"/groups/{group_id}/expenses/", {"json": {
+            "description": "index audit", "amount": 1.0,
+            "paid_by_user_id": member_ids[0], "participant_user_ids": member_ids,
+        }}),
+        ("POST", f"/groups/{group_id}/expenses/bulk", {"json": [{
+            "description": "index audit", "amount": 1.0,
+            "paid_by_user_id": member_ids[0], "participant_user_ids": member_ids,
+        }]}),
+    ]
+
+
+def explain(conn, statement, parameters):
+    """Returns (table, access type, index, full scan?, index available?) per plan row."""
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        plans = []
+        for row in rows:
+            detail = row[-1]
+            if detail.startswith("SCAN "):
+                table = detail.split()[1]
+                uses_index = "INDEX" in detail
+                plans.append((table, "SCAN", detail, not uses_index, False))
+            elif detail.startswith("SEARCH "):
+                plans.append((detail.split()[1], "SEARCH", detail, False, True))
+        return plans
+
+    result = conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+    columns = list(result.keys())
+    plans = []
+    for row in result.fetchall():
+        row = dict(zip(columns, row))
+        if not row.get("table"):
+            continue
+        full_scan = row.get("type") == "ALL"
+        plans.append((row["table"], row.get("type"), row.get("key"), full_scan, bool(row.get("possible_keys"))))
+    return plans
+
+
+def run_audit(group_id, email):
+    # Run every request on one connection inside a transaction that is
+    # rolled back at the end; the endpoints' commits become savepoints
+    conn = database.engine.connect()
+    outer = conn.begin()
+    database.SessionLocal.configure(bind=conn, join_transaction_mode="create_savepoint")
+
+    captured = []
+    current = {"route": None}
+
+    @event.listens_for(conn, "before_cursor_execute")
+    def record(_conn, _cursor, statement, parameters, _context, executemany):
+        if current["route"] and not executemany and statement.lstrip().upper().startswith(EXPLAINABLE):
+            captured.append((current["route"], statement, parameters))
+
+    failures = 0
+    try:
+        setup = database.SessionLocal()
+        calls = build_requests(setup, group_id, email)
+        setup.close()
+
+        client = TestClient(main.app)
+        for method, path, kwargs in calls:
+            current["route"] = f"{method} {path}"
+            res = client.request(method, path, **kwargs)
+            current["route"] = None
+            if res.status_code >= 400:
+                print(f"{method} {path} returned {res.status_code}: {res.text}")
+                failures += 1
+
+        event.remove(conn, "before_cursor_execute", record)
+        print(f"{'route':<40}{'table':<24}{'access':<10}{'index':<45}result")
+        for route, statement, parameters in captured:
+            for table, access, key, full_scan, has_index in explain(conn, statement, parameters):
+                if not full_scan:
+                    verdict = "ok"
+                elif has_index:
+                    verdict = "scan (index unused, table too small?)"
+                else:
+                    verdict = "FULL SCAN"
+                    failures += 1
+                print(f"{route:<40}{table:<24}{str(access):<10}{str(key):<45}{verdict}")
+    finally:
+        outer.rollback()
+        conn.close()
+        database.SessionLocal.configure(bind=database.engine, join_transaction_mode="conditional_savepoint")
+
+    print(f"\n{len(captured)} statements audited, {failures} problems")
+    return 1 if failures else 0
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN every query issued by the API endpoints.")
+    parser.add_argument("--group-id", type=int, required=True, help="an existing group with members")
+    parser.add_argument("--email", required=True, help="email of an existing user")
+    args = parser.parse_args(argv)
+    return run_audit(args.group_id, args.email)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,68 @@
+# gunicorn.conf.py
+"""
+Multi-worker deployment profile: gunicorn managing uvicorn workers.
+
+    python migrate.py                      # once per deploy, before any worker starts
+    gunicorn -c gunicorn.conf.py main:app
+
+Requires gunicorn and uvicorn-worker (pip install gunicorn uvicorn-worker).
+
+The app is imported once in the master and the workers are forked from
+it (preload_app). That is safe because importing main opens no database
+connection: engines and their pools are created lazily by each worker's
+first request, and the schema is left to migrate.py. A deploy therefore
+costs one import instead of one per worker, and no worker touches MySQL
+before it has traffic.
+
+Every worker holds its own pools, one per engine (sync, plus async unless
+DATABASE_ASYNC=false), so the node's connection budget is split between
+them: DATABASE_CONNECTIONS_PER_NODE (default 120) / workers / engines,
+two thirds kept open and the rest as overflow. Explicit
+DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW settings take precedence.
+Keep the budget times the node count under MySQL's max_connections. The
+budget is per database server: each replica in DATABASE_REPLICA_URLS
+gets pools of the same size.
+
+With more than one worker, point CACHE_URL and EVENTS_URL at Redis so
+the read cache and balance events are shared across workers.
+
+Settings (environment): BIND (0.0.0.0:8000), WEB_CONCURRENCY (one worker
+per CPU), DATABASE_CONNECTIONS_PER_NODE.
+"""
+
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+# Read .env before the pool defaults below, so settings made there still win
+load_dotenv()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# Workers are async, so one per core keeps every core busy
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+
+# Seconds a silent worker is given before it is restarted; report requests can take a few
+timeout = 60
+graceful_timeout = 30
+# Longer than the load balancer's idle timeout would cut connections mid-request; shorter wastes them
+keepalive = 5
+# Recycle workers now and then, staggered so they never restart together
+max_requests = 10000
+max_requests_jitter = 1000
+
+# --- Per-worker pool sizing ---
+CONNECTIONS_PER_NODE = int(os.getenv("DATABASE_CONNECTIONS_PER_NODE", "120"))
+_engines = 2 if os.getenv("DATABASE_ASYNC", "true").lower() == "true" else 1
+_per_pool = max(2, CONNECTIONS_PER_NODE // (workers * _engines))
+os.environ.setdefault("DATABASE_POOL_SIZE", str(max(1, _per_pool * 2 // 3)))
+os.environ.setdefault("DATABASE_MAX_OVERFLOW", str(_per_pool - int(os.environ["DATABASE_POOL_SIZE"])))
+
+
+def when_ready(server):
+    server.log.info(
+        "%d workers, database pool %s + %s overflow per engine",
+        workers, os.environ["DATABASE_POOL_SIZE"], os.environ["DATABASE_MAX_OVERFLOW"],
+    )
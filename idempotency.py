@@ -0,0 +1,135 @@
+# idempotency.py
+"""
+Idempotency keys for retry-safe writes.
+
+A client (or the gateway in front of the API) sends an `Idempotency-Key`
+header with a write. The key is claimed by inserting its row in the same
+transaction as the write, and the response is stored in that row before
+commit, so either the expense and its stored response are both committed
+or neither is. A retry with the same key then gets the stored response
+back without the write running again. Two requests racing with one key
+serialize on the row's primary key: the loser waits for the winner to
+commit and replays its response.
+
+Reusing a key for a different request is an error. Keys expire after
+IDEMPOTENCY_TTL seconds; expired rows are ignored, and are deleted
+periodically by the API or on demand:
+
+    python idempotency.py purge
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal, missing_tables
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Seconds between the purges a worker runs alongside its writes
+PURGE_INTERVAL = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+
+_last_purge = monotonic()
+_purge_lock = threading.Lock()
+
+
+class KeyReuseError(Exception):
+    """The key was already used for a different request."""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _cutoff(ttl: int) -> datetime:
+    return _utcnow() - timedelta(seconds=ttl)
+
+
+def fingerprint(*parts: str) -> str:
+    """Hash identifying a request, e.g. of its method, path and body."""
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def claim(db: Session, key: str, request_fingerprint: str) -> Tuple[models.IdempotencyKey, bool]:
+    """
+    Claims `key` for this request inside the caller's transaction, which must not have written anything yet.
+    Returns the key's row and whether it is new. A new row must be completed before commit;
+    otherwise the row holds the response to replay.
+    """
+    stored = db.get(models.IdempotencyKey, key)
+    if stored is not None and stored.created_at < _cutoff(IDEMPOTENCY_TTL):
+        db.delete(stored)
+        db.flush()
+        stored = None
+
+    if stored is None:
+        stored = models.IdempotencyKey(
+            key=key, fingerprint=request_fingerprint, status_code=0, response_body="", created_at=_utcnow()
+        )
+        db.add(stored)
+        try:
+            # Waits here while a concurrent request holding the same key is still in flight
+            db.flush()
+            return stored, True
+        except IntegrityError:
+            db.rollback()
+            stored = db.get(models.IdempotencyKey, key)
+
+    if stored.fingerprint != request_fingerprint:
+        raise KeyReuseError(key)
+    return stored, False
+
+
+def complete(db: Session, stored: models.IdempotencyKey, status_code: int, response_body: str) -> None:
+    """Records the response for a claimed key; it is committed with the caller's transaction."""
+    stored.status_code = status_code
+    stored.response_body = response_body
+    _maybe_purge(db)
+
+
+def purge(db: Session, ttl: int = IDEMPOTENCY_TTL) -> int:
+    """Deletes keys older than `ttl` seconds; returns how many were removed."""
+    result = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.created_at < _cutoff(ttl)))
+    return result.rowcount
+
+
+def _maybe_purge(db: Session) -> None:
+    """Purges expired keys at most once per PURGE_INTERVAL per worker, on the created_at index."""
+    global _last_purge
+    with _purge_lock:
+        if monotonic() - _last_purge < PURGE_INTERVAL:
+            return
+        _last_purge = monotonic()
+    purge(db)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Delete expired idempotency keys.")
+    parser.add_argument("command", choices=["purge"])
+    parser.add_argument("--ttl", type=int, default=IDEMPOTENCY_TTL, help="seconds a key is kept")
+    args = parser.parse_args(argv)
+
+    if missing_tables():
+        print("The database is missing tables; run `python migrate.py` first.", file=sys.stderr)
+        return 2
+    db = SessionLocal()
+    try:
+        count = purge(db, args.ttl)
+        db.commit()
+        print(f"Purged {count} idempotency keys")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# ledger.py
+"""
+Materialized per-member balance ledger.
+
+Every (group, member) pair has a row in `group_balances` holding the running
+total the member has paid and their total share, in cents. `create_expense` updates it
+in the same transaction as the expense itself, so balance reads are index
+lookups instead of aggregate scans over every expense.
+
+The ledger can always be recomputed from the raw expense rows. Rebuilding
+sums every expense, so it repairs the ledger even when the balance
+snapshots (snapshots.py) are wrong too. Verifying starts from the snapshots
+and only sums the expenses after their watermark; --full sums every expense:
+
+    python ledger.py verify [--group-id ID] [--full]
+    python ledger.py rebuild [--group-id ID]
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+import models
+import snapshots
+from database import SessionLocal, missing_tables
+from money import from_cents
+
+def init_members(db: Session, group_id: int, user_ids: Iterable[int]) -> None:
+    """Create zeroed ledger rows for new group members."""
+    for user_id in user_ids:
+        db.add(models.GroupBalance(group_id=group_id, user_id=user_id, paid_cents=0, share_cents=0))
+
+
+def apply_expense(db: Session, group_id: int, paid_by_user_id: int, amount_cents: int,
+                  shares: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Adds one expense to the ledger. Does not commit; the caller commits it
+    together with the expense rows. Returns the changes, as apply_deltas does.
+    """
+    return apply_expenses(db, group_id, [(paid_by_user_id, amount_cents, shares)])
+
+
+def apply_expenses(db: Session, group_id: int,
+                   expenses: Iterable[Tuple[int, int, Dict[int, int]]]) -> Dict[int, Tuple[int, int]]:
+    """
+    Adds a batch of (paid_by_user_id, amount_cents, {user_id: share_cents})
+    expenses to the ledger with a single read-modify-write of the affected rows.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for paid_by_user_id, amount_cents, shares in expenses:
+        deltas[paid_by_user_id][0] += amount_cents
+        for user_id, share_cents in shares.items():
+            deltas[user_id][1] += share_cents
+    if not deltas:
+        return {}
+    return apply_deltas(db, group_id, deltas)
+
+
+def apply_deltas(db: Session, group_id: int, deltas: Dict[int, List[int]]) -> Dict[int, Tuple[int, int]]:
+    """
+    Adds {user_id: [paid_cents, share_cents]} deltas to a group's ledger rows.
+    Returns {user_id: (change in net balance, new net balance)} in cents.
+    """
+    # Lock the affected rows so concurrent expenses don't lose updates
+    rows = db.query(models.GroupBalance).filter(
+        models.GroupBalance.group_id == group_id,
+        models.GroupBalance.user_id.in_(list(deltas))
+    ).with_for_update().all()
+    existing = {row.user_id: row for row in rows}
+
+    changes = {}
+    for user_id, (paid, share) in deltas.items():
+        row = existing.get(user_id)
+        if row is None:
+            # Payer or participant outside the group's member list
+            row = models.GroupBalance(group_id=group_id, user_id=user_id, paid_cents=0, share_cents=0)
+            db.add(row)
+        row.paid_cents += paid
+        row.share_cents += share
+        # The rows are locked, so the new totals are exact for this transaction
+        changes[user_id] = (paid - share, row.paid_cents - row.share_cents)
+    return changes
+
+
+def member_balances(db: Session, group_id: int) -> List[Tuple[int, str, int]]:
+    """(user_id, username, net balance in cents) for every member of a group."""
+    return member_balances_by_group(db, [group_id])[group_id]
+
+
+def member_balances_by_group(db: Session, group_ids: Iterable[int]) -> Dict[int, List[Tuple[int, str, int]]]:
+    """member_balances() for several groups in one query, keyed by group id."""
+    group_ids = list(group_ids)
+    rows = db.query(
+        models.group_members_table.c.group_id,
+        models.User.id, models.User.username, models.GroupBalance.paid_cents, models.GroupBalance.share_cents
+    ).join(
+        models.group_members_table, models.group_members_table.c.user_id == models.User.id
+    ).outerjoin(
+        models.GroupBalance,
+        and_(
+            models.GroupBalance.group_id == models.group_members_table.c.group_id,
+            models.GroupBalance.user_id == models.User.id
+        )
+    ).filter(models.group_members_table.c.group_id.in_(group_ids)).all()
+
+    members = {group_id: [] for group_id in group_ids}
+    for group_id, user_id, username, paid, share in rows:
+        members[group_id].append((user_id, username, (paid or 0) - (share or 0)))
+    return members
+
+
+def group_balances(db: Session, group_id: int) -> Dict[str, float]:
+    """Net balance of every member of a group, keyed by username."""
+    return {username: from_cents(net) for _, username, net in member_balances(db, group_id)}
+
+
+def user_group_totals(db: Session, user_id: int) -> List[Tuple[int, str, int, int]]:
+    """(group_id, group_name, paid_cents, share_cents) for every group the user belongs to, in one query."""
+    rows = db.query(
+        models.Group.id, models.Group.name, models.GroupBalance.paid_cents, models.GroupBalance.share_cents
+    ).join(
+        models.group_members_table, models.group_members_table.c.group_id == models.Group.id
+    ).outerjoin(
+        models.GroupBalance,
+        and_(
+            models.GroupBalance.group_id == models.Group.id,
+            models.GroupBalance.user_id == models.group_members_table.c.user_id
+        )
+    ).filter(models.group_members_table.c.user_id == user_id).order_by(models.Group.id).all()
+
+    return [(g_id, name, paid or 0, share or 0) for g_id, name, paid, share in rows]
+
+
+def compute_totals(db: Session, group_id: Optional[int] = None, full: bool = False) -> Dict[Tuple[int, int], List[int]]:
+    """
+    Recomputes {(group_id, user_id): [paid_cents, share_cents]} from the raw expense rows:
+    the balance snapshots plus the expenses after their watermark, or every expense when `full`.
+    """
+    member_query = db.query(models.group_members_table.c.group_id, models.group_members_table.c.user_id)
+    if group_id is not None:
+        member_query = member_query.filter(models.group_members_table.c.group_id == group_id)
+
+    totals = {(g_id, user_id): [0, 0] for g_id, user_id in member_query}
+    recomputed = snapshots.sums(db, 0, group_id=group_id) if full else snapshots.totals(db, group_id)
+    totals.update(recomputed)
+    return totals
+
+
+def verify(db: Session, group_id: Optional[int] = None, full: bool = False) -> List[str]:
+    """Compares the ledger against a recompute and describes every mismatch."""
+    expected = compute_totals(db, group_id, full)
+    query = db.query(models.GroupBalance)
+    if group_id is not None:
+        query = query.filter(models.GroupBalance.group_id == group_id)
+    actual = {(row.group_id, row.user_id): [row.paid_cents, row.share_cents] for row in query}
+    return snapshots.mismatches(expected, actual, "ledger")
+
+
+def rebuild(db: Session, group_id: Optional[int] = None) -> int:
+    """Replaces the ledger rows with a recompute from every expense. Returns the number of rows written."""
+    totals = compute_totals(db, group_id, full=True)
+    query = db.query(models.GroupBalance)
+    if group_id is not None:
+        query = query.filter(models.GroupBalance.group_id == group_id)
+    # "fetch" takes the deleted rows out of the session, so the new ones with the same keys don't clash
+    query.delete(synchronize_session="fetch")
+
+    db.add_all(
+        models.GroupBalance(group_id=g_id, user_id=user_id, paid_cents=paid, share_cents=share)
+        for (g_id, user_id), (paid, share) in totals.items()
+    )
+    db.commit()
+    return len(totals)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify or rebuild the group balance ledger.")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--group-id", type=int, default=None, help="limit to a single group")
+    parser.add_argument("--full", action="store_true",
+                        help="verify against every expense instead of the balance snapshots; rebuild always does")
+    args = parser.parse_args(argv)
+
+    if missing_tables():
+        print("The database is missing tables; run `python migrate.py` first.", file=sys.stderr)
+        return 2
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            count = rebuild(db, args.group_id)
+            print(f"Rebuilt {count} ledger rows")
+            return 0
+
+        problems = verify(db, args.group_id, args.full)
+        for problem in problems:
+            print(problem)
+        print("Ledger OK" if not problems else f"{len(problems)} ledger mismatches")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
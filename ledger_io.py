@@ -0,0 +1,311 @@
+# ledger_io.py
+"""
+CSV and Parquet export and import of a group's expense ledger.
+
+A ledger file has one row per expense participant, in expense order:
+
+    expense_id, created_at, description, paid_by_user_id, amount_cents, user_id, share_cents
+
+Amounts are integer cents, as stored, so a file round-trips exactly.
+
+Exports run one query over Expense joined with ExpenseParticipant on a
+server-side cursor and encode it CHUNK_SIZE rows at a time: a CSV chunk,
+or a Parquet row group. Memory stays constant however long the history
+is, and the first bytes go out before the last rows are read.
+
+Imports read a file row by row (Parquet a row group at a time), gather
+each expense's rows, and insert BATCH_SIZE expenses at a time: their
+participants in one executemany and the ledger update in the same
+transaction, committed per batch. Expenses keep their created_at, so
+reports place them where they were, and get new ids; their recorded_at
+is the time of the import. An expense whose
+shares don't add up to its amount, or whose payer or participants are
+not in the group, is skipped and reported. Rows of one expense must be
+adjacent, as exports write them. A file that turns unreadable partway
+through ends the import there, keeping the batches already committed.
+
+Parquet needs pyarrow; without it only CSV is available.
+"""
+
+import csv
+import io
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import ledger
+import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: CSV works without it
+    pa = pq = None
+
+CSV = "csv"
+PARQUET = "parquet"
+FORMATS = (CSV, PARQUET)
+MEDIA_TYPES = {CSV: "text/csv; charset=utf-8", PARQUET: "application/vnd.apache.parquet"}
+
+COLUMNS = ("expense_id", "created_at", "description", "paid_by_user_id", "amount_cents", "user_id", "share_cents")
+
+# Rows read from the database, or from a Parquet file, per chunk
+CHUNK_SIZE = 10000
+# Expenses inserted and committed per transaction on import
+BATCH_SIZE = 5000
+# Rejected expenses listed in an import's result; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+# Same limit as the column
+MAX_DESCRIPTION = 255
+
+if pa is not None:
+    PARQUET_SCHEMA = pa.schema([
+        ("expense_id", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("paid_by_user_id", pa.int64()),
+        ("amount_cents", pa.int64()),
+        ("user_id", pa.int64()),
+        ("share_cents", pa.int64()),
+    ])
+
+
+class ImportedExpense(NamedTuple):
+    source_id: object  # expense_id in the file
+    created_at: datetime
+    description: str
+    paid_by_user_id: int
+    amount_cents: int
+    shares: Dict[int, int]  # {user_id: share_cents}
+
+
+class ImportSummary(NamedTuple):
+    imported: int
+    skipped: int
+    errors: List[Tuple[str, str]]  # (expense_id in the file, reason), at most MAX_REPORTED_ERRORS
+    stopped: str = ""  # Why the rest of the file was not imported, when it became unreadable after a commit
+
+
+# --- Export ---
+def _partitions(db: Session, group_id: int):
+    """The group's participant rows, in COLUMNS order, CHUNK_SIZE at a time from a server-side cursor."""
+    query = select(
+        models.Expense.id, models.Expense.created_at, models.Expense.description, models.Expense.paid_by_user_id,
+        models.Expense.amount_cents, models.ExpenseParticipant.user_id, models.ExpenseParticipant.share_cents
+    ).join(
+        models.ExpenseParticipant, models.ExpenseParticipant.expense_id == models.Expense.id
+    ).where(
+        models.Expense.group_id == group_id
+    ).order_by(models.Expense.id, models.ExpenseParticipant.user_id)
+    # A Core execution skips the ORM's per-row work, as in reports.py
+    return db.connection().execution_options(yield_per=CHUNK_SIZE).execute(query).partitions()
+
+
+def export_csv(db: Session, group_id: int) -> Iterator[bytes]:
+    """Yields the group's ledger as CSV, a header and then one encoded chunk per CHUNK_SIZE rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in _partitions(db, group_id):
+        writer.writerows(
+            (expense_id, created_at.isoformat(), *rest) for expense_id, created_at, *rest in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header is left for a group without expenses
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink:
+    """Write-only file that keeps what the Parquet writer wrote until it is drained."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_parquet(db: Session, group_id: int) -> Iterator[bytes]:
+    """Yields the group's ledger as a Parquet file, one row group per CHUNK_SIZE rows."""
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, PARQUET_SCHEMA)
+    for rows in _partitions(db, group_id):
+        writer.write_table(pa.Table.from_pydict(dict(zip(COLUMNS, zip(*rows))), schema=PARQUET_SCHEMA))
+        yield sink.drain()
+    # The footer, with the schema even when the group has no expenses
+    writer.close()
+    yield sink.drain()
+
+
+def export(db: Session, group_id: int, file_format: str) -> Iterator[bytes]:
+    return export_parquet(db, group_id) if file_format == PARQUET else export_csv(db, group_id)
+
+
+# --- Import ---
+def _csv_rows(file: BinaryIO) -> Iterator[tuple]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    missing = set(COLUMNS) - set(header or ())
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+    # Put the columns in COLUMNS order, whatever order the file has them in
+    order = itemgetter(*(header.index(column) for column in COLUMNS))
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(header):
+            raise ValueError(f"Line {reader.line_num} has {len(row)} cells instead of {len(header)}.")
+        yield order(row)
+
+
+def _parquet_rows(file: BinaryIO) -> Iterator[tuple]:
+    parquet = pq.ParquetFile(file)
+    missing = set(COLUMNS) - set(parquet.schema_arrow.names)
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+    for batch in parquet.iter_batches(batch_size=CHUNK_SIZE, columns=list(COLUMNS)):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def _parse_expense(source_id, rows: List[tuple]) -> ImportedExpense:
+    _, created_at, description, paid_by_user_id, amount_cents = rows[0][:5]
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if not isinstance(created_at, datetime):
+        raise ValueError("created_at is missing.")
+    shares = {}
+    for row in rows:
+        user_id = int(row[5])
+        if user_id in shares:
+            raise ValueError(f"User {user_id} appears twice.")
+        shares[user_id] = int(row[6])
+    expense = ImportedExpense(
+        source_id, created_at, description or "", int(paid_by_user_id), int(amount_cents), shares
+    )
+    if len(expense.description) > MAX_DESCRIPTION:
+        raise ValueError(f"Description is longer than {MAX_DESCRIPTION} characters.")
+    if sum(shares.values()) != expense.amount_cents:
+        raise ValueError("Shares don't add up to the amount.")
+    return expense
+
+
+def read_expenses(file: BinaryIO, file_format: str) -> Iterator[Tuple[object, Optional[ImportedExpense], str]]:
+    """
+    Yields (expense_id in the file, expense, "") for each expense of a ledger file,
+    or (expense_id, None, reason) for one that can't be parsed.
+    Raises ValueError when the file lacks a column.
+    """
+    rows = _parquet_rows(file) if file_format == PARQUET else _csv_rows(file)
+    for source_id, group in groupby(rows, key=itemgetter(0)):
+        # Read outside the try: an unreadable file is not this expense's fault
+        expense_rows = list(group)
+        try:
+            yield source_id, _parse_expense(source_id, expense_rows), ""
+        except (TypeError, ValueError) as e:
+            yield source_id, None, str(e)
+
+
+def _batches(expenses: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in expenses:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert_batch(db: Session, group_id: int, expenses: List[ImportedExpense]):
+    """Inserts expenses with their participants and ledger changes, and commits. Returns (new ids, ledger changes)."""
+    new_expenses = [
+        models.Expense(
+            description=expense.description,
+            amount_cents=expense.amount_cents,
+            group_id=group_id,
+            paid_by_user_id=expense.paid_by_user_id,
+            created_at=expense.created_at
+        )
+        for expense in expenses
+    ]
+    db.add_all(new_expenses)
+    db.flush()
+    # On the Core table: the ORM's bulk insert bookkeeping costs more than the INSERT on batches this size
+    db.execute(insert(models.ExpenseParticipant.__table__), [
+        {"expense_id": new_expense.id, "user_id": user_id, "share_cents": share_cents}
+        for new_expense, expense in zip(new_expenses, expenses)
+        for user_id, share_cents in expense.shares.items()
+    ])
+    changes = ledger.apply_expenses(db, group_id, [
+        (expense.paid_by_user_id, expense.amount_cents, expense.shares) for expense in expenses
+    ])
+    created_ids = [exp.id for exp in new_expenses]
+    db.commit()
+    # Nothing of a committed batch is needed again
+    db.expunge_all()
+    return created_ids, changes
+
+
+def import_file(db: Session, group_id: int, member_ids: Set[int], file: BinaryIO, file_format: str,
+                on_commit: Optional[Callable[[List[int], dict], None]] = None,
+                batch_size: int = BATCH_SIZE) -> ImportSummary:
+    """
+    Imports a ledger file into a group, committing every batch_size expenses.
+    on_commit(new expense ids, ledger changes) is called after each commit.
+    Raises ValueError when the file is unreadable before anything was committed;
+    past that point, the import stops and the summary says why in `stopped`.
+    Batches committed before an error stay committed.
+    """
+    imported = skipped = 0
+    errors = []
+
+    def accepted():
+        nonlocal skipped
+        for source_id, expense, reason in read_expenses(file, file_format):
+            if expense is not None and (
+                expense.paid_by_user_id not in member_ids or not member_ids.issuperset(expense.shares)
+            ):
+                expense, reason = None, "Payer and participants must be members of the group."
+            if expense is None:
+                skipped += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((str(source_id), reason))
+                continue
+            yield expense
+
+    try:
+        for batch in _batches(accepted(), batch_size):
+            created_ids, changes = _insert_batch(db, group_id, batch)
+            imported += len(created_ids)
+            if on_commit is not None:
+                on_commit(created_ids, changes)
+    except ValueError as e:
+        # Bad encoding, a ragged row, a corrupt row group: the file can't be read past here
+        if not imported:
+            raise
+        return ImportSummary(
+            imported, skipped, errors, f"{e} Expenses after the last committed batch were not imported."
+        )
+    return ImportSummary(imported, skipped, errors)
@@ -1,25 +1,51 @@
 # main.py
 
-from fastapi import FastAPI, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+import asyncio
+import math
+import tempfile
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from datetime import date
+from typing import List, Optional, Union
 # Import models, schemas, and the database session dependency
-import models, schemas
-from database import SessionLocal, engine, get_db
+import models, schemas, ledger, settlements, instrumentation, cache, events, reports, idempotency, encoding, snapshots, ledger_io
+from database import (
+    READ_YOUR_WRITES_SECONDS, ReadYourWritesMiddleware, SessionLocal, dispose_engines,
+    get_db, get_async_db, get_async_read_db, get_read_db, read_session, run_db, use_replica,
+)
+from money import SplitError, from_cents, split, to_cents
 from typing import Dict
 from pydantic import ValidationError
-# Create all database tables on startup
-models.Base.metadata.create_all(bind=engine)
+# The schema is created and migrated by `python migrate.py`, run once per
+# deploy, not by every worker at import; see create_app below.
 
-app = FastAPI(title="Expense Splitter API")
+router = APIRouter()
 
-@app.get("/")
+# Most groups GET /groups/balances answers in one call
+MAX_BATCH_GROUPS = 100
+
+@router.get("/")
 def read_root():
     return {"message": "Welcome to the Expense Splitter API"}
 
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(
+        instrumentation.render_metrics() + cache.render_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
 # --- User Endpoints ---
-@app.post("/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
+@router.post("/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 def create_user(user: dict, db: Session = Depends(get_db)):
     try:
         validated_user = schemas.UserCreate(**user)
@@ -36,19 +62,76 @@ def create_user(user: dict, db: Session = Depends(get_db)):
     return new_user
 
 # --- All Users Endpoint ---
-@app.get("/users/", response_model=List[schemas.User])
-def get_all_users(db: Session = Depends(get_db)):
-    users = db.query(models.User).all()
-    return [{"id": u.id, "username": u.username, "email": u.email} for u in users]
+@router.get("/users/", response_model=schemas.UserPage)
+def get_all_users(
+    after_id: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    q: str = Query("", max_length=255),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Pages through users in id order, keyed on User.id.
+    q keeps only usernames that start with it.
+    """
+    query = db.query(models.User).filter(models.User.id > after_id)
+    if q:
+        query = query.filter(models.User.username.startswith(q, autoescape=True))
+    users = query.order_by(models.User.id).limit(limit + 1).all()
+    has_more = len(users) > limit
+    users = users[:limit]
+    return schemas.UserPage(
+        items=[schemas.User.model_validate(u) for u in users],
+        next_cursor=users[-1].id if has_more else None
+    )
 
-@app.get("/groups" , response_model=List[schemas.Group])
-def get_all_groups(db: Session = Depends(get_db)):
-    groups = db.query(models.Group).all()
-    return [{"id" : g.id , "name" : g.name , "members" : g.members} for g in groups]
+@router.get("/groups", response_model=schemas.GroupPage)
+def get_all_groups(
+    after_id: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    q: str = Query("", max_length=255),
+    include_members: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Pages through groups in id order, keyed on Group.id.
+    q keeps only names that start with it. Each group carries its member
+    count; include_members=true also lists the members, loaded in one
+    extra query for the whole page.
+    """
+    query = db.query(models.Group).filter(models.Group.id > after_id)
+    if q:
+        query = query.filter(models.Group.name.startswith(q, autoescape=True))
+    if include_members:
+        query = query.options(selectinload(models.Group.members))
+    groups = query.order_by(models.Group.id).limit(limit + 1).all()
+    has_more = len(groups) > limit
+    groups = groups[:limit]
+
+    if include_members:
+        member_counts = {g.id: len(g.members) for g in groups}
+    else:
+        member_counts = dict(db.query(
+            models.group_members_table.c.group_id, func.count()
+        ).filter(
+            models.group_members_table.c.group_id.in_([g.id for g in groups])
+        ).group_by(models.group_members_table.c.group_id).all())
+
+    return schemas.GroupPage(
+        items=[
+            schemas.GroupListing(
+                id=g.id,
+                name=g.name,
+                member_count=member_counts.get(g.id, 0),
+                members=[schemas.User.model_validate(m) for m in g.members] if include_members else None
+            )
+            for g in groups
+        ],
+        next_cursor=groups[-1].id if has_more else None
+    )
 
 
 # --- Group Endpoints ---
-@app.post("/groups/", response_model=schemas.Group, status_code=status.HTTP_201_CREATED)
+@router.post("/groups/", response_model=schemas.Group, status_code=status.HTTP_201_CREATED)
 def create_group(group: schemas.GroupCreate, db: Session = Depends(get_db)):
     new_group = models.Group(name=group.name)
     # Find user objects from the provided IDs
@@ -58,93 +141,466 @@ def create_group(group: schemas.GroupCreate, db: Session = Depends(get_db)):
     new_group.members.extend(members)
     
     db.add(new_group)
+    db.flush()
+    # Start every member with an empty ledger row
+    ledger.init_members(db, new_group.id, [m.id for m in members])
     db.commit()
+    # The new group appears in each member's summary
+    cache.bump(*(f"user:{m.id}" for m in members))
     db.refresh(new_group)
     return new_group
 
+def _get_group_or_404(db: Session, group_id: int) -> models.Group:
+    group = db.query(models.Group).filter(models.Group.id == group_id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return group
+
+def _invalidate_group(db: Session, group_id: int) -> None:
+    """Expires cached reads of a group and the summaries of all its members. Call after commit."""
+    user_ids = db.query(models.group_members_table.c.user_id).filter(
+        models.group_members_table.c.group_id == group_id
+    ).all()
+    cache.bump(f"group:{group_id}", *(f"user:{user_id}" for user_id, in user_ids))
+
+def _publish_balance_changes(group_id: int, expense_ids: List[int], changes) -> None:
+    """Sends a committed write's {user_id: (delta, balance)} cent changes to the group's event stream."""
+    event = schemas.BalanceEvent(
+        group_id=group_id,
+        expense_ids=expense_ids,
+        changes=[
+            schemas.BalanceChange(user_id=user_id, delta=from_cents(delta), balance=from_cents(balance))
+            for user_id, (delta, balance) in changes.items()
+        ]
+    )
+    events.publish(group_id, event.model_dump_json())
+
+async def _cached_json(request: Request, name: str, scope: str, compute):
+    """
+    Serves a JSON body from the versioned cache, tagged with the scope's version as ETag.
+    A matching If-None-Match gets a 304 before any database work; on a miss compute() is awaited.
+    """
+    scope_version = cache.version(scope)
+    # Each representation gets its own tag, as caches key on it together with Vary
+    representation = "-msgpack" if encoding.wants_msgpack(request) else ""
+    etag = f'W/"{name}-{scope_version}{representation}"'
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        cache.record_not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Vary": "Accept"})
+
+    body = cache.lookup(name, scope, scope_version)
+    if body is None:
+        body = encoding.jsonable(await compute())
+        if use_replica(request) and cache.changed_within(scope_version, READ_YOUR_WRITES_SECONDS):
+            # A replica may not have the write behind this version yet, so
+            # neither cache the body nor tag it with the new version
+            return encoding.render(request, body)
+        cache.store(name, scope, scope_version, body)
+    return encoding.render(request, body, headers={"ETag": etag})
+
 # --- Expense Endpoint ---
-@app.post("/groups/{group_id}/expenses/", response_model=schemas.Expense, status_code=status.HTTP_201_CREATED)
-def create_expense(group_id: int, expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
+def _claim_idempotency_key(db: Session, key: Optional[str], *request_parts: str):
+    """
+    Claims the request's Idempotency-Key, if it sent one.
+    Returns (row to complete before commit, None), or (None, stored response) when the key was already used.
+    """
+    if key is None:
+        return None, None
+    try:
+        stored, is_new = idempotency.claim(db, key, idempotency.fingerprint(*request_parts))
+    except idempotency.KeyReuseError:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request.")
+    if is_new:
+        return stored, None
+    return None, Response(
+        content=stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+@router.post("/groups/{group_id}/expenses/", response_model=schemas.Expense, status_code=status.HTTP_201_CREATED)
+async def create_expense(group_id: int, expense: schemas.ExpenseCreate,
+                         idempotency_key: Optional[str] = Header(None, max_length=255),
+                         db: Union[Session, AsyncSession] = Depends(get_async_db)):
+    return await run_db(db, _create_expense, group_id, expense, idempotency_key)
+
+
+def _create_expense(db: Session, group_id: int, expense: schemas.ExpenseCreate,
+                    idempotency_key: Optional[str] = None):
     if not expense.participant_user_ids:
         raise HTTPException(status_code=400, detail="Expense must have at least one participant.")
+    if len(set(expense.participant_user_ids)) != len(expense.participant_user_ids):
+        raise HTTPException(status_code=400, detail="Participant user IDs must be unique.")
     
-    # Core logic: Calculate the share for each participant
-    share_amount = round(expense.amount / len(expense.participant_user_ids), 2)
+    # Core logic: Split the amount into cent shares that add up exactly to the total
+    amount_cents = to_cents(expense.amount)
+    try:
+        shares = dict(zip(
+            expense.participant_user_ids,
+            split(amount_cents, expense.split, len(expense.participant_user_ids), expense.split_values)
+        ))
+    except SplitError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # A retry of a request that already went through gets the stored response back
+    request_key, replay = _claim_idempotency_key(
+        db, idempotency_key, "POST", f"/groups/{group_id}/expenses/", expense.model_dump_json()
+    )
+    if replay is not None:
+        return replay
+
+    # One count over the membership rows, instead of loading every member as the bulk path does
+    involved = set(expense.participant_user_ids) | {expense.paid_by_user_id}
+    members = db.scalar(
+        select(func.count()).select_from(models.group_members_table).where(
+            models.group_members_table.c.group_id == group_id,
+            models.group_members_table.c.user_id.in_(involved)
+        )
+    )
+    if members != len(involved):
+        _get_group_or_404(db, group_id)
+        raise HTTPException(status_code=400, detail="Payer and participants must be members of the group.")
     
     # Create the main expense record
     new_expense = models.Expense(
         description=expense.description,
-        amount=expense.amount,
+        amount_cents=amount_cents,
         group_id=group_id,
         paid_by_user_id=expense.paid_by_user_id
     )
     db.add(new_expense)
-    db.commit()
-    db.refresh(new_expense)
+    db.flush()
     
-    # Create the participant records with their calculated share
-    for user_id in expense.participant_user_ids:
-        participant = models.ExpenseParticipant(
-            expense_id=new_expense.id,
-            user_id=user_id,
-            share_amount=share_amount
+    # Create the participant records with their calculated share, in one executemany
+    db.execute(insert(models.ExpenseParticipant), [
+        {"expense_id": new_expense.id, "user_id": user_id, "share_cents": share_cents}
+        for user_id, share_cents in shares.items()
+    ])
+    
+    # Keep the balance ledger in step, in the same transaction as the expense
+    changes = ledger.apply_expense(db, group_id, expense.paid_by_user_id, amount_cents, shares)
+    if request_key is not None:
+        idempotency.complete(
+            db, request_key, status.HTTP_201_CREATED, schemas.Expense.model_validate(new_expense).model_dump_json()
         )
-        db.add(participant)
     
+    # Expense, participants, ledger and stored response are committed together
     db.commit()
+    _invalidate_group(db, group_id)
+    db.refresh(new_expense)
+    _publish_balance_changes(group_id, [new_expense.id], changes)
     return new_expense
 
+@router.post("/groups/{group_id}/expenses/bulk", response_model=schemas.BulkExpenseResult, status_code=status.HTTP_201_CREATED)
+def create_expenses_bulk(group_id: int, expenses: List[schemas.ExpenseCreate],
+                         idempotency_key: Optional[str] = Header(None, max_length=255),
+                         db: Session = Depends(get_db)):
+    """
+    Adds many expenses to a group in one transaction.
+    Rows that fail validation are reported back by index and skipped; the rest are inserted.
+    """
+    request_key, replay = _claim_idempotency_key(
+        db, idempotency_key, "POST", f"/groups/{group_id}/expenses/bulk",
+        "[" + ",".join(expense.model_dump_json() for expense in expenses) + "]"
+    )
+    if replay is not None:
+        return replay
+
+    group = _get_group_or_404(db, group_id)
+    # Validate membership against a single lookup of the group's members
+    member_ids = {member.id for member in group.members}
+
+    # Validate and split every row up front; only rows that pass are written
+    errors = []
+    accepted = []
+    amounts = []
+    shares = []
+    for index, expense in enumerate(expenses):
+        participant_ids = expense.participant_user_ids
+        if not participant_ids:
+            detail = "Expense must have at least one participant."
+        elif len(set(participant_ids)) != len(participant_ids):
+            detail = "Participant user IDs must be unique."
+        elif expense.paid_by_user_id not in member_ids or not member_ids.issuperset(participant_ids):
+            detail = "Payer and participants must be members of the group."
+        else:
+            amount_cents = to_cents(expense.amount)
+            try:
+                expense_shares = split(amount_cents, expense.split, len(participant_ids), expense.split_values)
+            except SplitError as e:
+                detail = str(e)
+            else:
+                accepted.append(expense)
+                amounts.append(amount_cents)
+                shares.append(dict(zip(participant_ids, expense_shares)))
+                continue
+        errors.append(schemas.BulkExpenseError(index=index, detail=detail))
+
+    new_expenses = [
+        models.Expense(
+            description=expense.description,
+            amount_cents=amount_cents,
+            group_id=group_id,
+            paid_by_user_id=expense.paid_by_user_id
+        )
+        for expense, amount_cents in zip(accepted, amounts)
+    ]
+    # SQLAlchemy batches these INSERTs where the driver can return the new ids
+    db.add_all(new_expenses)
+    db.flush()
+
+    participant_rows = [
+        {"expense_id": new_expense.id, "user_id": user_id, "share_cents": share_cents}
+        for new_expense, expense_shares in zip(new_expenses, shares)
+        for user_id, share_cents in expense_shares.items()
+    ]
+    if participant_rows:
+        # One executemany for every participant row of the batch
+        db.execute(insert(models.ExpenseParticipant), participant_rows)
+
+    changes = ledger.apply_expenses(db, group_id, [
+        (expense.paid_by_user_id, amount_cents, expense_shares)
+        for expense, amount_cents, expense_shares in zip(accepted, amounts, shares)
+    ])
+
+    # Read the ids before commit expires the objects
+    created_ids = [exp.id for exp in new_expenses]
+    result = schemas.BulkExpenseResult(created_ids=created_ids, errors=errors)
+    if request_key is not None:
+        idempotency.complete(db, request_key, status.HTTP_201_CREATED, result.model_dump_json())
+    db.commit()
+    if created_ids:
+        _invalidate_group(db, group_id)
+        _publish_balance_changes(group_id, created_ids, changes)
+    return result
+
+# --- Expense History Endpoint ---
+def _expense_page(db: Session, group_id: int, after_id: int, limit: int):
+    """Fetches up to limit + 1 expenses after the cursor, so the caller can tell whether more follow."""
+    return db.query(models.Expense).options(
+        selectinload(models.Expense.participants)
+    ).filter(
+        models.Expense.group_id == group_id,
+        models.Expense.id > after_id
+    ).order_by(models.Expense.id).limit(limit + 1).all()
+
+
+def _expense_item(exp: models.Expense) -> dict:
+    """An ExpenseDetail as plain data, built straight from the loaded rows without validating them again."""
+    return {
+        "id": exp.id,
+        "description": exp.description,
+        "amount": from_cents(exp.amount_cents),
+        "paid_by_user_id": exp.paid_by_user_id,
+        "participants": [
+            {"user_id": participant.user_id, "share_amount": from_cents(participant.share_cents)}
+            for participant in exp.participants
+        ],
+    }
+
+
+def _stream_session(request: Request, group_id: int) -> Session:
+    """
+    A session of the stream's own for a streamed response about a group, once the group is found.
+    A dependency's session would stay checked out until the response ends, however long the stream.
+    """
+    db = read_session(request)
+    try:
+        _get_group_or_404(db, group_id)
+    except BaseException:
+        db.close()
+        raise
+    return db
+
+
+def _stream_expenses(db: Session, group_id: int, after_id: int, batch_size: int):
+    """Yields the group's expenses after the cursor as NDJSON, one keyset batch in memory at a time, and closes db."""
+    try:
+        while True:
+            batch = _expense_page(db, group_id, after_id, batch_size - 1)
+            for exp in batch:
+                yield encoding.dumps_json(_expense_item(exp)) + b"\n"
+            if len(batch) < batch_size:
+                break
+            after_id = batch[-1].id
+            db.expunge_all()
+    finally:
+        db.close()
+
+
+@router.get("/groups/{group_id}/expenses/", response_model=schemas.ExpensePage)
+async def list_group_expenses(
+    group_id: int,
+    request: Request,
+    after_id: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Union[Session, AsyncSession] = Depends(get_async_read_db)
+):
+    """
+    Pages through a group's expenses oldest first, keyed on Expense.id.
+    With format=ndjson the whole history after the cursor is streamed as
+    newline-delimited JSON, fetched in batches of `limit`.
+    Pages are also available as MessagePack with Accept: application/msgpack.
+    """
+    if format == "ndjson":
+        stream_db = await run_in_threadpool(_stream_session, request, group_id)
+        return StreamingResponse(_stream_expenses(stream_db, group_id, after_id, limit), media_type="application/x-ndjson")
+
+    return encoding.render(request, await run_db(db, _list_group_expenses, group_id, after_id, limit))
+
+
+def _list_group_expenses(db: Session, group_id: int, after_id: int, limit: int):
+    _get_group_or_404(db, group_id)
+    expenses = _expense_page(db, group_id, after_id, limit)
+    has_more = len(expenses) > limit
+    expenses = expenses[:limit]
+    # Shaped like schemas.ExpensePage; a page of a large group holds thousands of participants
+    return {
+        "items": [_expense_item(exp) for exp in expenses],
+        "next_cursor": expenses[-1].id if has_more else None,
+    }
+
+# --- Ledger Export / Import ---
+# Uploads beyond this many bytes are spooled to a temporary file instead of memory
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+def _stream_export(db: Session, group_id: int, file_format: str):
+    try:
+        yield from ledger_io.export(db, group_id, file_format)
+    finally:
+        db.close()
+
+
+def _check_ledger_format(file_format: str) -> None:
+    if file_format == ledger_io.PARQUET and ledger_io.pq is None:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Parquet needs pyarrow on the server.")
+
+
+@router.get("/groups/{group_id}/export")
+async def export_group_ledger(
+    group_id: int,
+    request: Request,
+    format: str = Query(ledger_io.CSV, pattern="^(csv|parquet)$")
+):
+    """
+    Downloads a group's expenses, one row per participant with amounts in
+    cents, as CSV or Parquet. Rows are streamed from a server-side cursor,
+    so any history is exported in constant memory.
+    """
+    _check_ledger_format(format)
+    db = await run_in_threadpool(_stream_session, request, group_id)
+    return StreamingResponse(
+        _stream_export(db, group_id, format),
+        media_type=ledger_io.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="group-{group_id}-ledger.{format}"'}
+    )
+
+
+@router.post("/groups/{group_id}/import", response_model=schemas.LedgerImportResult)
+async def import_group_ledger(
+    group_id: int,
+    request: Request,
+    format: str = Query(ledger_io.CSV, pattern="^(csv|parquet)$")
+):
+    """
+    Adds the expenses of a ledger file, in the format export writes, to a group.
+    The request body is the file. Expenses are inserted and committed in
+    batches; rejected ones are skipped and reported.
+    """
+    _check_ledger_format(format)
+    # Parquet is read from its footer, so the upload is spooled before parsing
+    upload = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES)
+    try:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        return await run_in_threadpool(_import_ledger, group_id, upload, format)
+    finally:
+        upload.close()
+
+
+def _import_ledger(group_id: int, upload, file_format: str) -> schemas.LedgerImportResult:
+    db = SessionLocal()
+    try:
+        group = _get_group_or_404(db, group_id)
+        member_ids = {member.id for member in group.members}
+
+        def committed(created_ids, changes):
+            _invalidate_group(db, group_id)
+            _publish_balance_changes(group_id, created_ids, changes)
+
+        try:
+            summary = ledger_io.import_file(db, group_id, member_ids, upload, file_format, on_commit=committed)
+        except ValueError as e:
+            # The file is unreadable, e.g. a missing column, before anything was committed
+            raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
+    return schemas.LedgerImportResult(
+        imported=summary.imported,
+        skipped=summary.skipped,
+        errors=[schemas.LedgerImportError(expense_id=source_id, detail=reason) for source_id, reason in summary.errors],
+        stopped=summary.stopped or None
+    )
+
 # --- User Summary Endpoint ---
-@app.get("/users/summary/", response_model=schemas.UserSummary)
-def get_user_summary(email: str, db: Session = Depends(get_db)):
+@router.get("/users/summary/", response_model=schemas.UserSummary)
+async def get_user_summary(email: str, request: Request, db: Union[Session, AsyncSession] = Depends(get_async_read_db)):
     """
     Retrieves a full financial summary for a user based on their email.
     Shows all groups they are a part of and their net balance in each group.
+    Expense history is not included; page it with /groups/{group_id}/expenses/.
     """
+    # Scoped by id, as writes bump it: the email as typed may differ in case from the stored one
+    user = await run_db(db, _get_user_by_email_or_404, email)
+    return await _cached_json(request, "summary", f"user:{user.id}", lambda: run_db(db, _user_summary, user))
+
+
+def _get_user_by_email_or_404(db: Session, email: str) -> models.User:
     # Step 1: Find the user by email
     user = db.query(models.User).filter(models.User.email == email).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        
-    # Step 2: Find all groups the user is a member of
-    user_groups = db.query(models.Group).filter(models.Group.members.any(id=user.id)).all()
+    return user
+
+
+def _user_summary(db: Session, user: models.User):
+    # Step 2: Find all groups the user is a member of, with their ledger totals, in one query
+    user_groups = ledger.user_group_totals(db, user.id)
     
-    group_statuses = []
+    # Step 3: Count each group's expenses in one grouped query; the history itself
+    # is paged through /groups/{group_id}/expenses/
+    expense_stats = {}
+    if user_groups:
+        expense_stats = {
+            group_id: (count, last_id)
+            for group_id, count, last_id in db.query(
+                models.Expense.group_id, func.count(models.Expense.id), func.max(models.Expense.id)
+            ).filter(
+                models.Expense.group_id.in_([group_id for group_id, _, _, _ in user_groups])
+            ).group_by(models.Expense.group_id)
+        }
     
-    # Step 3: For each group, calculate the user's financial status
-    for group in user_groups:
-        # Get all expenses for this group to show in the response
-        group_expenses_from_db = db.query(models.Expense).filter(models.Expense.group_id == group.id).all()
-        detailed_expenses = [schemas.ExpenseDetail.from_orm(exp) for exp in group_expenses_from_db]
-        
-        # Calculate the total amount the user has paid for this group's expenses
-        total_paid_by_user = db.query(func.sum(models.Expense.amount)).filter(
-            models.Expense.group_id == group.id,
-            models.Expense.paid_by_user_id == user.id
-        ).scalar() or 0.0
-        
-        # Calculate the user's total share from all expenses in this group
-        total_user_share = db.query(func.sum(models.ExpenseParticipant.share_amount)).join(models.Expense).filter(
-            models.Expense.group_id == group.id,
-            models.ExpenseParticipant.user_id == user.id
-        ).scalar() or 0.0
-        
-        # The net balance is the difference
-        net_balance = round(total_paid_by_user - total_user_share, 2)
-        
-        # Create the status object for this group
-        group_status = schemas.GroupStatus(
-            group_id=group.id,
-            group_name=group.name,
-            total_you_paid=round(total_paid_by_user, 2),
-            your_total_share=round(total_user_share, 2),
-            net_balance=net_balance,
-            expenses=detailed_expenses
+    # Built from our own rows, so skip validation: model_construct only sets the fields
+    group_statuses = [
+        schemas.GroupStatus.model_construct(
+            group_id=group_id,
+            group_name=group_name,
+            total_you_paid=from_cents(total_paid_by_user),
+            your_total_share=from_cents(total_user_share),
+            # The net balance is the difference
+            net_balance=from_cents(total_paid_by_user - total_user_share),
+            expense_count=expense_stats.get(group_id, (0, None))[0],
+            expenses_cursor=expense_stats.get(group_id, (0, None))[1]
         )
-        group_statuses.append(group_status)
+        for group_id, group_name, total_paid_by_user, total_user_share in user_groups
+    ]
 
     # Step 4: Assemble the final summary object and return it
-    return schemas.UserSummary(
+    return schemas.UserSummary.model_construct(
         user_id=user.id,
         username=user.username,
         email=user.email,
@@ -152,32 +608,271 @@ def get_user_summary(email: str, db: Session = Depends(get_db)):
     )
 
 
-@app.get("/groups/{group_id}/balances/", response_model=Dict[str, float])
-def get_group_balances(group_id: int, db: Session = Depends(get_db)):
+@router.get("/groups/balances", response_model=List[schemas.GroupBalances])
+async def get_balances_for_groups(
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_GROUPS),
+    include_settlements: bool = False,
+    mode: str = Query(settlements.MINIMAL, pattern="^(greedy|minimal)$"),
+    db: Union[Session, AsyncSession] = Depends(get_async_read_db)
+):
+    """
+    Member balances for several groups at once, e.g. ?ids=1&ids=2&include_settlements=true.
+    Every group is read in one query, replacing a balances or settlements call per group.
+    """
+    members_by_group = await run_db(db, _balances_for_groups, ids)
+    if not include_settlements:
+        return _balance_sheets(members_by_group, None)
+    return await run_in_threadpool(_balance_sheets, members_by_group, mode)
+
+
+def _balances_for_groups(db: Session, group_ids: List[int]):
+    group_ids = list(dict.fromkeys(group_ids))
+    found = {group_id for group_id, in db.query(models.Group.id).filter(models.Group.id.in_(group_ids))}
+    missing = [group_id for group_id in group_ids if group_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Groups not found: {missing}")
+    return ledger.member_balances_by_group(db, group_ids)
+
+
+def _balance_sheets(members_by_group, mode) -> List[schemas.GroupBalances]:
+    return [
+        schemas.GroupBalances(
+            group_id=group_id,
+            balances={username: from_cents(net) for _, username, net in members},
+            settlement=_build_settlement_plan(group_id, members, mode) if mode else None
+        )
+        for group_id, members in members_by_group.items()
+    ]
+
+
+@router.get("/groups/{group_id}/balances/", response_model=Dict[str, float])
+async def get_group_balances(group_id: int, request: Request,
+                             db: Union[Session, AsyncSession] = Depends(get_async_read_db)):
     """
     Calculates and returns the net balance for every member in a specific group.
     A positive balance means the user is owed money.
     A negative balance means the user owes money.
     """
-    group = db.query(models.Group).filter(models.Group.id == group_id).first()
-    if not group:
-        raise HTTPException(status_code=404, detail="Group not found")
+    return await _cached_json(request, "balances", f"group:{group_id}", lambda: run_db(db, _group_balances, group_id))
+
+
+def _group_balances(db: Session, group_id: int):
+    _get_group_or_404(db, group_id)
+    return ledger.group_balances(db, group_id)
+
+
+@router.get("/groups/{group_id}/settlements", response_model=schemas.SettlementPlan)
+async def get_group_settlements(group_id: int, request: Request,
+                                mode: str = Query(settlements.MINIMAL, pattern="^(greedy|minimal)$"),
+                                db: Union[Session, AsyncSession] = Depends(get_async_read_db)):
+    """
+    Works out who should pay whom to settle the group.
+    mode=minimal finds the fewest possible transfers (falling back to greedy for very large groups);
+    mode=greedy is always fast but may need more transfers.
+    """
+    return await _cached_json(
+        request, f"settlements-{mode}", f"group:{group_id}", lambda: _settlement_plan(db, group_id, mode)
+    )
+
+
+async def _settlement_plan(db: Union[Session, AsyncSession], group_id: int, mode: str):
+    members = await run_db(db, _member_balances, group_id)
+    # The exact search can take tens of milliseconds, so keep it off the event loop
+    return await run_in_threadpool(_build_settlement_plan, group_id, members, mode)
+
+
+def _build_settlement_plan(group_id: int, members, mode: str) -> schemas.SettlementPlan:
+    usernames = {user_id: username for user_id, username, _ in members}
+    plan = settlements.plan({user_id: net for user_id, _, net in members}, mode)
+
+    return schemas.SettlementPlan(
+        group_id=group_id,
+        mode=mode,
+        optimal=plan.optimal,
+        transfers=[
+            schemas.Settlement(
+                from_user_id=t.debtor,
+                from_username=usernames[t.debtor],
+                to_user_id=t.creditor,
+                to_username=usernames[t.creditor],
+                amount=from_cents(t.amount_cents)
+            )
+            for t in plan.transfers
+        ]
+    )
+
+
+def _member_balances(db: Session, group_id: int):
+    _get_group_or_404(db, group_id)
+    return ledger.member_balances(db, group_id)
+
+
+@router.get("/groups/{group_id}/report", response_model=schemas.GroupReport)
+async def get_group_report(
+    group_id: int,
+    request: Request,
+    bucket: str = Query(reports.MONTH, pattern="^(day|week|month)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    """
+    Spending of a group per day, week or month, with what each member paid
+    and owed overall and per bucket, from start up to but not including end.
+    Members are listed most paid first. Results are cached until the group's
+    next expense.
+    """
+    return await _cached_json(
+        request, f"report-{bucket}-{start}-{end}", f"group:{group_id}",
+        # The whole history is read and aggregated, so keep it off the event loop
+        lambda: run_in_threadpool(_group_report, group_id, bucket, start, end, lambda: read_session(request))
+    )
+
+
+def _group_report(group_id: int, bucket: str, start: Optional[date], end: Optional[date],
+                  open_session=SessionLocal):
+    # Streaming with yield_per needs a plain session
+    db = open_session()
+    try:
+        group = _get_group_or_404(db, group_id)
+        report = reports.build(db, group_id, bucket, start, end)
+        usernames = {member.id: member.username for member in group.members}
+        outsiders = [user_id for user_id, *_ in report.members if user_id not in usernames]
+        if outsiders:
+            # Payers or participants no longer in the group's member list
+            usernames.update(db.query(models.User.id, models.User.username).filter(models.User.id.in_(outsiders)).all())
+    finally:
+        db.close()
+
+    members = [
+        schemas.MemberSpending(
+            user_id=user_id, username=usernames[user_id],
+            paid=from_cents(paid), share=from_cents(share), expenses_paid=count
+        )
+        for user_id, paid, share, count in report.members
+    ]
+    # Members with no expenses in the range still appear, at zero
+    listed = {member.user_id for member in members}
+    members.extend(
+        schemas.MemberSpending(user_id=user_id, username=username, paid=0, share=0, expenses_paid=0)
+        for user_id, username in usernames.items() if user_id not in listed
+    )
+
+    return schemas.GroupReport(
+        group_id=group_id,
+        bucket=bucket,
+        start=start,
+        end=end,
+        total=from_cents(sum(total for _, total, _ in report.periods)),
+        expense_count=sum(count for _, _, count in report.periods),
+        periods=[
+            schemas.SpendingPeriod(period_start=period, total=from_cents(total), expense_count=count)
+            for period, total, count in report.periods
+        ],
+        members=members,
+        member_periods=[
+            schemas.MemberPeriod(user_id=user_id, period_start=period, paid=from_cents(paid), share=from_cents(share))
+            for user_id, period, paid, share in report.member_periods
+        ]
+    )
+
+
+@router.get("/groups/{group_id}/events")
+async def group_events(group_id: int):
+    """
+    Streams a group's balance changes as Server-Sent Events.
+    The stream opens with a `snapshot` event holding every member's balance,
+    then sends a `balance` event with the changed balances after each
+    committed expense write. A snapshot is sent again if the client falls
+    too far behind; a reconnecting client starts over from a snapshot.
+    """
+    # Subscribe before reading the snapshot so no write can fall between the two
+    subscription = await events.subscribe(group_id)
+    try:
+        members = await run_in_threadpool(_fresh_member_balances, group_id)
+    except BaseException:
+        await subscription.close()
+        raise
+    return StreamingResponse(
+        _event_stream(group_id, subscription, members),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _balance_snapshot(group_id: int, members) -> str:
+    snapshot = schemas.BalanceSnapshot(
+        group_id=group_id,
+        balances=[
+            schemas.MemberBalance(user_id=user_id, username=username, balance=from_cents(net))
+            for user_id, username, net in members
+        ]
+    )
+    return events.sse("snapshot", snapshot.model_dump_json())
+
+
+def _fresh_member_balances(group_id: int):
+    # A dependency's session stays open until the response ends, which for an event
+    # stream is when the client leaves; each read takes a connection only while it runs
+    db = SessionLocal()
+    try:
+        return _member_balances(db, group_id)
+    finally:
+        db.close()
+
+
+async def _event_stream(group_id: int, subscription, members):
+    try:
+        yield _balance_snapshot(group_id, members)
+        while True:
+            message = await subscription.get(timeout=events.KEEPALIVE_SECONDS)
+            if message is None:
+                yield ": keep-alive\n\n"
+            elif message is events.RESYNC:
+                members = await run_in_threadpool(_fresh_member_balances, group_id)
+                yield _balance_snapshot(group_id, members)
+            else:
+                yield events.sse("balance", message)
+    finally:
+        await subscription.close()
+
+
+# --- App factory ---
+async def _validation_error(request: Request, exc: RequestValidationError) -> JSONResponse:
+    """FastAPI's 422 response, except that non-finite inputs are echoed as strings: NaN is not JSON."""
+    errors = [
+        {**error, "input": str(error["input"])}
+        if isinstance(error.get("input"), float) and not math.isfinite(error["input"]) else error
+        for error in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing touches the database at startup: engines and pools are created
+    # by the first request that needs them, so a fleet of workers starting at
+    # once does not stampede the database
+    compaction = None
+    if snapshots.SNAPSHOT_INTERVAL > 0:
+        # Sleeps first, so its first query comes an interval after startup
+        compaction = asyncio.create_task(snapshots.run_periodically())
+    yield
+    if compaction is not None:
+        compaction.cancel()
+    await dispose_engines()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="Expense Splitter API", lifespan=lifespan)
+    # Per-route statement counts, DB time and latency; see /metrics.
+    # Listening on the Engine class covers the lazily created engines too.
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+    instrumentation.instrument_engine(Engine)
+    # Heavy reads go to replicas when configured; writers keep reading the primary for a while
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_exception_handler(RequestValidationError, _validation_error)
+    app.include_router(router)
+    return app
+
 
-    balances = {}
-    for member in group.members:
-        # Calculate total amount paid by this member in this group
-        total_paid = db.query(func.sum(models.Expense.amount)).filter(
-            models.Expense.group_id == group_id,
-            models.Expense.paid_by_user_id == member.id
-        ).scalar() or 0.0
-
-        # Calculate total share for this member in this group
-        total_share = db.query(func.sum(models.ExpenseParticipant.share_amount)).join(models.Expense).filter(
-            models.Expense.group_id == group_id,
-            models.ExpenseParticipant.user_id == member.id
-        ).scalar() or 0.0
-        
-        net_balance = total_paid - total_share
-        balances[member.username] = round(net_balance, 2)
-        
-    return balances
\ No newline at end of file
+app = create_app()
@@ -0,0 +1,202 @@
+# migrate.py
+"""
+One-shot schema creation and migrations, run once per deploy before the
+API workers start (they no longer create tables themselves):
+
+    python migrate.py
+
+Each migration checks whether it is still needed, so running the command
+again is harmless.
+"""
+
+import sys
+from itertools import groupby
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+import ledger
+import models
+from database import SessionLocal, get_engine
+from money import split_evenly
+
+# Rows written per executemany when backfilling
+BATCH_SIZE = 5000
+
+UPDATE_SHARE = text(
+    "UPDATE expense_participants SET share_cents = :share_cents "
+    "WHERE expense_id = :expense_id AND user_id = :user_id"
+)
+
+
+def _columns(bind: Engine, table: str) -> set:
+    return {column["name"] for column in inspect(bind).get_columns(table)}
+
+
+def create_schema(bind: Engine) -> bool:
+    """Creates the tables a new database (or a new version of the models) lacks."""
+    existing = set(inspect(bind).get_table_names())
+    missing = [table for table in models.Base.metadata.sorted_tables if table.name not in existing]
+    models.Base.metadata.create_all(bind, tables=missing)
+    return bool(missing)
+
+
+def money_to_minor_units(bind: Engine) -> bool:
+    """
+    Moves expenses and shares from FLOAT to BIGINT cents.
+
+    Old shares were round(amount / n, 2) and rarely added up to the expense,
+    so every expense is re-split with split_evenly. The ledger is then
+    rebuilt from the corrected rows.
+
+    MySQL commits each ALTER on its own, so every step checks whether it is
+    still needed and a run that failed partway can simply be run again. The
+    float columns are dropped last: while they exist, the migration is not
+    finished.
+    """
+    if not inspect(bind).has_table("expenses"):
+        return False
+    expense_columns = _columns(bind, "expenses")
+    participant_columns = _columns(bind, "expense_participants")
+    if "amount" not in expense_columns and "share_amount" not in participant_columns:
+        return False
+
+    # Added nullable, so rows not backfilled yet can be told apart. A column
+    # left by an interrupted run holds zeros instead, hence the checks below
+    if "amount_cents" not in expense_columns:
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE expenses ADD COLUMN amount_cents BIGINT NULL"))
+    if "share_cents" not in participant_columns:
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE expense_participants ADD COLUMN share_cents BIGINT NULL"))
+
+    if "amount" in expense_columns:
+        with bind.begin() as conn:
+            conn.execute(text(
+                "UPDATE expenses SET amount_cents = ROUND(amount * 100) "
+                "WHERE amount_cents IS NULL OR amount_cents <> ROUND(amount * 100)"
+            ))
+
+    # Stream the expenses whose shares are missing or don't add up, with their
+    # participants, on one connection and write the new shares on another, so
+    # only a batch of rows is held at a time. The writes commit together, so
+    # an expense is either fully re-split or not at all
+    with bind.connect() as reader, bind.begin() as writer:
+        rows = reader.execution_options(stream_results=True, yield_per=BATCH_SIZE).execute(text(
+            "SELECT e.id, e.amount_cents, p.user_id FROM expenses e "
+            "JOIN expense_participants p ON p.expense_id = e.id "
+            "WHERE e.id IN (SELECT sp.expense_id FROM expense_participants sp "
+            "JOIN expenses se ON se.id = sp.expense_id GROUP BY sp.expense_id, se.amount_cents "
+            "HAVING COUNT(sp.share_cents) < COUNT(*) OR SUM(sp.share_cents) <> se.amount_cents) "
+            "ORDER BY e.id, p.user_id"
+        ))
+        batch = []
+        for (expense_id, amount_cents), participants in groupby(rows, key=lambda row: (row[0], row[1])):
+            user_ids = [row[2] for row in participants]
+            for user_id, share_cents in zip(user_ids, split_evenly(amount_cents, len(user_ids))):
+                batch.append({"expense_id": expense_id, "user_id": user_id, "share_cents": share_cents})
+            if len(batch) >= BATCH_SIZE:
+                writer.execute(UPDATE_SHARE, batch)
+                batch = []
+        if batch:
+            writer.execute(UPDATE_SHARE, batch)
+
+    if bind.dialect.name != "sqlite":
+        # Every row has its cents now; SQLite can't change a column's nullability in place
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE expenses MODIFY amount_cents BIGINT NOT NULL"))
+            conn.execute(text("ALTER TABLE expense_participants MODIFY share_cents BIGINT NOT NULL"))
+
+    # The ledger only holds derived totals, so recreate it in cents if it is
+    # still in floats, and refill it
+    if not inspect(bind).has_table("group_balances") or "paid_cents" not in _columns(bind, "group_balances"):
+        models.GroupBalance.__table__.drop(bind, checkfirst=True)
+        models.GroupBalance.__table__.create(bind)
+    db = SessionLocal(bind=bind)
+    try:
+        ledger.rebuild(db)
+    finally:
+        db.close()
+
+    if "amount" in _columns(bind, "expenses"):
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE expenses DROP COLUMN amount"))
+    if "share_amount" in _columns(bind, "expense_participants"):
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE expense_participants DROP COLUMN share_amount"))
+    return True
+
+
+def add_expense_created_at(bind: Engine) -> bool:
+    """
+    Adds expenses.created_at for time-bucketed reports. Existing rows get
+    the time of the migration, since when they were added is not recorded.
+    """
+    if not inspect(bind).has_table("expenses") or "created_at" in _columns(bind, "expenses"):
+        return False
+
+    with bind.begin() as conn:
+        if bind.dialect.name == "sqlite":
+            # SQLite can only add a column with a constant default
+            conn.execute(text(
+                "ALTER TABLE expenses ADD COLUMN created_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'"
+            ))
+            conn.execute(text("UPDATE expenses SET created_at = CURRENT_TIMESTAMP"))
+        else:
+            conn.execute(text("ALTER TABLE expenses ADD COLUMN created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP"))
+    return True
+
+
+def add_expense_recorded_at(bind: Engine) -> bool:
+    """
+    Adds expenses.recorded_at, the insert time snapshot compaction settles
+    on. Existing rows get the time of the migration, as for created_at.
+    """
+    if not inspect(bind).has_table("expenses") or "recorded_at" in _columns(bind, "expenses"):
+        return False
+
+    with bind.begin() as conn:
+        if bind.dialect.name == "sqlite":
+            conn.execute(text(
+                "ALTER TABLE expenses ADD COLUMN recorded_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00'"
+            ))
+            conn.execute(text("UPDATE expenses SET recorded_at = CURRENT_TIMESTAMP"))
+        else:
+            conn.execute(text("ALTER TABLE expenses ADD COLUMN recorded_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP"))
+    return True
+
+
+def ensure_indexes(bind: Engine) -> bool:
+    """Creates indexes declared on the models that an existing database lacks."""
+    inspector = inspect(bind)
+    created = False
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created = True
+    return created
+
+
+# Applied in order
+MIGRATIONS = [
+    create_schema,
+    money_to_minor_units,
+    add_expense_created_at,
+    add_expense_recorded_at,
+    ensure_indexes,
+]
+
+
+def main() -> int:
+    for migration in MIGRATIONS:
+        applied = migration(get_engine())
+        print(f"{migration.__name__}: {'applied' if applied else 'already up to date'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
 # models.py
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text, ForeignKey, Table, func
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from typing import List
 from database import Base
+from money import from_cents
 
 # Association table for the many-to-many relationship between users and groups
 # This definition remains the same as it's standard SQLAlchemy Core.
 group_members_table = Table('group_members', Base.metadata,
     Column('group_id', Integer, ForeignKey('groups.id'), primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True)
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    # The primary key serves lookups by group; this one serves "groups of a user"
+    Index('ix_group_members_user_group', 'user_id', 'group_id')
 )
 
 class User(Base):
@@ -25,32 +29,101 @@ class Group(Base):
 
     # Modern syntax with type hints
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Indexed for prefix search in GET /groups
+    name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     
     # Relationship now includes a Mapped hint for better type checking
     members: Mapped[List["User"]] = relationship(secondary=group_members_table)
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Covers per-payer totals within a group without touching the table rows
+        Index("ix_expenses_group_payer_amount", "group_id", "paid_by_user_id", "amount_cents"),
+        # Keyset paging and counts of a group's expenses
+        Index("ix_expenses_group_id", "group_id", "id"),
+        # Date-bounded group reports
+        Index("ix_expenses_group_created", "group_id", "created_at"),
+    )
 
     # Modern syntax with type hints
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     description: Mapped[str] = mapped_column(String(255), nullable=False)
-    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    # Stored in integer minor units (cents)
+    amount_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
     group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"))
     paid_by_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    # Set by the database on insert. The INSERT supplies it too, since a
+    # column added by migrate.py on SQLite only has a constant default
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
+    # When the row was inserted, set the same way. Only differs from created_at for
+    # imported expenses, which keep theirs; snapshot compaction settles on this one
+    recorded_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=func.now(), server_default=func.now()
+    )
     
     # Relationship to participants with type hint
     participants: Mapped[List["ExpenseParticipant"]] = relationship(back_populates="expense")
 
+    @property
+    def amount(self) -> float:
+        return from_cents(self.amount_cents)
+
 class ExpenseParticipant(Base):
     __tablename__ = "expense_participants"
+    __table_args__ = (
+        # Covers per-user share totals; the primary key serves lookups by expense
+        Index("ix_expense_participants_user_expense_share", "user_id", "expense_id", "share_cents"),
+    )
     
     # Modern syntax for composite primary key
     expense_id: Mapped[int] = mapped_column(ForeignKey("expenses.id"), primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
-    share_amount: Mapped[float] = mapped_column(Float, nullable=False)
+    # Stored in integer minor units (cents)
+    share_cents: Mapped[int] = mapped_column(BigInteger, nullable=False)
     
     # Relationship back to the expense with type hint
     expense: Mapped["Expense"] = relationship(back_populates="participants")
 
+    @property
+    def share_amount(self) -> float:
+        return from_cents(self.share_cents)
+
+class GroupBalance(Base):
+    __tablename__ = "group_balances"
+
+    # Materialized ledger: running totals per member, maintained by create_expense
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    paid_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    share_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    @property
+    def net_cents(self) -> int:
+        """Positive means the member is owed money, negative means they owe."""
+        return self.paid_cents - self.share_cents
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Response of a write sent with an Idempotency-Key header, replayed on retries
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # Hash of the request the key was first used with
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False)
+    response_body: Mapped[str] = mapped_column(Text, nullable=False)
+    # Set from Python in UTC, so expiry compares the same clock on every backend
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+
+    # Per-member totals of a group's expenses up to an Expense.id watermark, advanced by snapshots.compact
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    paid_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    share_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # Last Expense.id folded into this row; the global watermark is the maximum
+    through_expense_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
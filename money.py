@@ -0,0 +1,106 @@
+# money.py
+"""
+Money helpers. Amounts are stored and summed as integer minor units
+(cents), so shares always add up to their expense and balance sums are
+exact. The API still speaks in major units.
+"""
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from typing import List, Optional, Sequence
+
+# Ways an expense can be split between its participants
+EQUAL = "equal"
+SHARES = "shares"
+PERCENTAGE = "percentage"
+EXACT = "exact"
+SPLIT_METHODS = (EQUAL, SHARES, PERCENTAGE, EXACT)
+
+# Largest expense amount accepted, in major units. Its cents stay exact in a
+# float and leave room in the BIGINT columns for a group's summed totals
+MAX_AMOUNT = 10 ** 12
+
+
+class SplitError(ValueError):
+    """The split values do not describe a valid split of the amount."""
+
+
+def to_cents(amount: float) -> int:
+    """Converts a major-unit amount to cents, rounding half up."""
+    # Go through str so 0.1 is read as 0.1, not its binary approximation
+    return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    """Converts cents back to a major-unit amount for API responses."""
+    return cents / 100
+
+
+def split_evenly(total_cents: int, parts: int) -> List[int]:
+    """
+    Splits an amount into `parts` shares that sum exactly to it.
+    The leftover cents go one each to the first shares.
+    """
+    base, remainder = divmod(total_cents, parts)
+    return [base + 1 if i < remainder else base for i in range(parts)]
+
+
+def split_proportionally(total_cents: int, weights: Sequence[Fraction]) -> List[int]:
+    """
+    Splits an amount in proportion to `weights` into shares that sum exactly to it.
+    Each share is rounded down and the leftover cents go to the largest
+    remainders, ties to the first shares as in split_evenly.
+    """
+    total_weight = sum(weights)
+    exact = [total_cents * weight / total_weight for weight in weights]
+    shares = [math.floor(value) for value in exact]
+    leftover = total_cents - sum(shares)
+    by_remainder = sorted(range(len(exact)), key=lambda i: (shares[i] - exact[i], i))
+    for i in by_remainder[:leftover]:
+        shares[i] += 1
+    return shares
+
+
+def split(total_cents: int, method: str, parts: int, values: Optional[Sequence[float]] = None) -> List[int]:
+    """
+    Splits an amount into `parts` shares by one of SPLIT_METHODS; the shares always sum exactly to it.
+
+        equal       no values
+        shares      values are weights, e.g. 2, 1, 1
+        percentage  values are percentages adding up to 100
+        exact       values are the amounts themselves, adding up to the total
+
+    Values line up with the participants. Raises SplitError when they don't fit the method.
+    """
+    if parts < 1:
+        raise SplitError("Expense must have at least one participant.")
+    if method not in SPLIT_METHODS:
+        raise SplitError(f"Unknown split: {method}")
+    if method == EQUAL:
+        if values is not None:
+            raise SplitError("Split values only apply to the shares, percentage and exact splits.")
+        return split_evenly(total_cents, parts)
+
+    if values is None or len(values) != parts:
+        raise SplitError("Give one split value per participant.")
+    if not all(math.isfinite(value) for value in values):
+        raise SplitError("Split values must be finite numbers.")
+    if any(value < 0 for value in values):
+        raise SplitError("Split values cannot be negative.")
+
+    if method == EXACT:
+        shares = [to_cents(value) for value in values]
+        if sum(shares) != total_cents:
+            raise SplitError(
+                f"Exact amounts add up to {from_cents(sum(shares))}, not the expense amount {from_cents(total_cents)}."
+            )
+        return shares
+
+    # Through str, like to_cents, so 33.33 + 33.33 + 33.34 is exactly 100
+    weights = [Fraction(str(value)) for value in values]
+    if method == PERCENTAGE and sum(weights) != 100:
+        raise SplitError(f"Percentages add up to {float(sum(weights)):g}, not 100.")
+    if method == SHARES and not any(weights):
+        raise SplitError("At least one participant needs a share above zero.")
+    return split_proportionally(total_cents, weights)
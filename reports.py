@@ -0,0 +1,164 @@
+# reports.py
+"""
+Spending reports for a group, computed with NumPy.
+
+Expenses and participant shares are streamed from the database
+CHUNK_SIZE rows at a time (yield_per). Each chunk becomes a few int64
+arrays that are reduced to sums per time bucket and per (member, bucket)
+with vectorized ops, and the partial sums are merged. Only expenses
+carry a timestamp: participant rows, by far the most numerous, are read
+as plain integers and find their bucket by expense id. Memory therefore
+depends on the number of expenses, members and buckets, but not on the
+number of participant rows.
+
+Amounts stay integer cents throughout, so totals are exact.
+"""
+
+from datetime import date
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import models
+
+DAY = "day"
+WEEK = "week"
+MONTH = "month"
+BUCKETS = (DAY, WEEK, MONTH)
+
+# Rows fetched from the database per chunk
+CHUNK_SIZE = 10000
+
+# (member, bucket) pairs are packed into one int64 key as user_id * KEY_SPAN + day,
+# where day counts days since 1970-01-01 (good until the year 4840)
+KEY_SPAN = 1 << 20
+
+
+class Report(NamedTuple):
+    periods: List[Tuple[date, int, int]]  # (period start, total cents, expense count)
+    members: List[Tuple[int, int, int, int]]  # (user_id, paid cents, share cents, expenses paid)
+    member_periods: List[Tuple[int, date, int, int]]  # (user_id, period start, paid cents, share cents)
+
+
+class _Sums:
+    """Running int64 sums and counts per key, merged one chunk at a time."""
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int64)
+        self.sums = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, keys: np.ndarray, values: np.ndarray) -> None:
+        keys = np.concatenate([self.keys, keys])
+        values = np.concatenate([self.sums, values])
+        counts = np.concatenate([self.counts, np.ones(len(keys) - len(self.keys), dtype=np.int64)])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.sums = np.zeros(len(self.keys), dtype=np.int64)
+        self.counts = np.zeros(len(self.keys), dtype=np.int64)
+        np.add.at(self.sums, inverse, values)
+        np.add.at(self.counts, inverse, counts)
+
+    def at(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sums and counts for `keys`, zero where a key has none."""
+        if not len(self.keys):
+            zeros = np.zeros(len(keys), dtype=np.int64)
+            return zeros, zeros
+        index = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[index] == keys
+        return np.where(found, self.sums[index], 0), np.where(found, self.counts[index], 0)
+
+
+def bucket_days(created: np.ndarray, bucket: str) -> np.ndarray:
+    """First day of each timestamp's bucket, as days since 1970-01-01."""
+    days = created.astype("datetime64[D]")
+    if bucket == MONTH:
+        return days.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    days = days.astype(np.int64)
+    if bucket == WEEK:
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return days - (days + 3) % 7
+    return days
+
+
+def _partitions(db: Session, query):
+    """Yields the query's rows CHUNK_SIZE at a time."""
+    # A Core execution skips the ORM's per-row work, which dominates on long histories
+    return db.connection().execution_options(yield_per=CHUNK_SIZE).execute(query).partitions()
+
+
+def _chunks(db: Session, query):
+    """Yields integer-only rows CHUNK_SIZE at a time as an int64 array with one row per selected column."""
+    for rows in _partitions(db, query):
+        width = len(rows[0])
+        flat = np.fromiter((value for row in rows for value in row), dtype=np.int64, count=len(rows) * width)
+        yield flat.reshape(-1, width).T
+
+
+def _to_dates(days: np.ndarray) -> List[date]:
+    return days.astype("datetime64[D]").tolist()
+
+
+def build(db: Session, group_id: int, bucket: str = MONTH,
+          start: Optional[date] = None, end: Optional[date] = None) -> Report:
+    """Spending of a group per bucket and per member, from start up to but not including end."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket: {bucket}")
+
+    conditions = [models.Expense.group_id == group_id]
+    if start is not None:
+        conditions.append(models.Expense.created_at >= start)
+    if end is not None:
+        conditions.append(models.Expense.created_at < end)
+
+    # Bucket each expense once; participants then look their bucket up by expense id
+    expense_ids, expense_days = [], []
+    spending = _Sums()
+    paid = _Sums()
+    expenses = select(
+        models.Expense.id, models.Expense.paid_by_user_id, models.Expense.amount_cents, models.Expense.created_at
+    ).where(*conditions)
+    for rows in _partitions(db, expenses):
+        ids, payers, amounts, created = zip(*rows)
+        chunk_days = bucket_days(np.array(created, dtype="datetime64[s]"), bucket)
+        amounts = np.array(amounts, dtype=np.int64)
+        spending.add(chunk_days, amounts)
+        paid.add(np.array(payers, dtype=np.int64) * KEY_SPAN + chunk_days, amounts)
+        expense_ids.append(np.array(ids, dtype=np.int64))
+        expense_days.append(chunk_days)
+
+    expense_ids = np.concatenate(expense_ids) if expense_ids else np.empty(0, dtype=np.int64)
+    expense_days = np.concatenate(expense_days) if expense_days else np.empty(0, dtype=np.int64)
+    order = np.argsort(expense_ids)
+    expense_ids, expense_days = expense_ids[order], expense_days[order]
+
+    shares = _Sums()
+    participants = select(
+        models.ExpenseParticipant.expense_id, models.ExpenseParticipant.user_id, models.ExpenseParticipant.share_cents
+    ).join(models.Expense, models.Expense.id == models.ExpenseParticipant.expense_id).where(*conditions)
+    for participant_expenses, user_ids, share_cents in _chunks(db, participants):
+        participant_days = expense_days[np.searchsorted(expense_ids, participant_expenses)]
+        shares.add(user_ids * KEY_SPAN + participant_days, share_cents)
+
+    # Line up paid and share sums over every (member, bucket) pair that has either
+    keys = np.union1d(paid.keys, shares.keys)
+    paid_cents, paid_counts = paid.at(keys)
+    share_cents, _ = shares.at(keys)
+    users, days = np.divmod(keys, KEY_SPAN)
+
+    member_ids, inverse = np.unique(users, return_inverse=True)
+    totals = np.zeros((3, len(member_ids)), dtype=np.int64)
+    np.add.at(totals[0], inverse, paid_cents)
+    np.add.at(totals[1], inverse, share_cents)
+    np.add.at(totals[2], inverse, paid_counts)
+    # Most paid first, so the top payers lead
+    order = np.lexsort((member_ids, -totals[0]))
+
+    return Report(
+        periods=list(zip(_to_dates(spending.keys), spending.sums.tolist(), spending.counts.tolist())),
+        members=list(zip(
+            member_ids[order].tolist(), totals[0][order].tolist(), totals[1][order].tolist(), totals[2][order].tolist()
+        )),
+        member_periods=list(zip(users.tolist(), _to_dates(days), paid_cents.tolist(), share_cents.tolist())),
+    )
@@ -1,7 +1,10 @@
 # schemas.py
 
-from pydantic import BaseModel, EmailStr
-from typing import List
+from datetime import date
+from pydantic import BaseModel, EmailStr, Field
+from typing import Annotated, Dict, List, Literal, Optional
+
+from money import MAX_AMOUNT
 
 # User Schemas
 class UserBase(BaseModel):
@@ -27,13 +30,35 @@ class Group(BaseModel):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    """A page of users; pass next_cursor as after_id to get the next one."""
+    items: List[User]
+    next_cursor: Optional[int] = None
+
+class GroupListing(BaseModel):
+    """A group in a listing; members are only filled in when requested."""
+    id: int
+    name: str
+    member_count: int
+    members: Optional[List[User]] = None
+
+class GroupPage(BaseModel):
+    """A page of groups; pass next_cursor as after_id to get the next one."""
+    items: List[GroupListing]
+    next_cursor: Optional[int] = None
+
 
 # Expense Schemas
 class ExpenseCreate(BaseModel):
     description: str
-    amount: float
+    # Bounded and finite, so to_cents always gets a number that fits the column
+    amount: float = Field(gt=0, le=MAX_AMOUNT, allow_inf_nan=False)
     paid_by_user_id: int
     participant_user_ids: List[int]
+    # How the amount is divided. split_values line up with participant_user_ids:
+    # weights for "shares", percentages for "percentage", amounts for "exact"
+    split: Literal["equal", "shares", "percentage", "exact"] = "equal"
+    split_values: Optional[List[Annotated[float, Field(allow_inf_nan=False)]]] = None
 
 class Expense(BaseModel):
     id: int
@@ -43,6 +68,28 @@ class Expense(BaseModel):
     class Config:
         from_attributes = True
 
+class BulkExpenseError(BaseModel):
+    """A rejected row of a bulk expense upload."""
+    index: int  # Position of the row in the submitted list
+    detail: str
+
+class BulkExpenseResult(BaseModel):
+    """Outcome of a bulk expense upload."""
+    created_ids: List[int] = []  # Ids of the inserted expenses, in submission order
+    errors: List[BulkExpenseError] = []
+
+class LedgerImportError(BaseModel):
+    """An expense of an imported ledger file that was skipped."""
+    expense_id: str  # The expense's id in the file
+    detail: str
+
+class LedgerImportResult(BaseModel):
+    """Outcome of a ledger import."""
+    imported: int  # Expenses inserted
+    skipped: int  # Expenses rejected; the first ones are listed in errors
+    errors: List[LedgerImportError] = []
+    stopped: Optional[str] = None  # Set when the file turned unreadable after some expenses were committed
+
 class ExpenseParticipantDetail(BaseModel):
     """Schema for showing participant details within an expense."""
     user_id: int
@@ -62,6 +109,11 @@ class ExpenseDetail(BaseModel):
     class Config:
         from_attributes = True
 
+class ExpensePage(BaseModel):
+    """One keyset page of a group's expense history, oldest first."""
+    items: List[ExpenseDetail] = []
+    next_cursor: Optional[int] = None  # Pass as after_id to get the next page; None on the last page
+
 class GroupStatus(BaseModel):
     """Represents the user's financial status within a single group."""
     group_id: int
@@ -69,11 +121,91 @@ class GroupStatus(BaseModel):
     total_you_paid: float
     your_total_share: float
     net_balance: float  # Positive means you are owed, negative means you owe
-    expenses: List[ExpenseDetail] = []
+    expense_count: int = 0
+    # Keyset cursor: id of the newest expense. Pass it as after_id to
+    # /groups/{group_id}/expenses/ to fetch only expenses added since.
+    expenses_cursor: Optional[int] = None
 
 class UserSummary(BaseModel):
     """The main response model for the user's complete summary."""
     user_id: int
     username: str
     email: EmailStr
-    groups: List[GroupStatus] = []
\ No newline at end of file
+    groups: List[GroupStatus] = []
+
+class Settlement(BaseModel):
+    """A single transfer: the debtor pays the creditor."""
+    from_user_id: int
+    from_username: str
+    to_user_id: int
+    to_username: str
+    amount: float
+
+class SettlementPlan(BaseModel):
+    """The transfers that settle every balance in a group."""
+    group_id: int
+    mode: str
+    optimal: bool  # True when no plan with fewer transfers exists
+    transfers: List[Settlement] = []
+
+class GroupBalances(BaseModel):
+    """One group's member balances, and optionally its settlement plan."""
+    group_id: int
+    balances: Dict[str, float]  # username -> net balance; positive means owed
+    settlement: Optional[SettlementPlan] = None
+
+class MemberBalance(BaseModel):
+    """A member's net balance; positive means they are owed money."""
+    user_id: int
+    username: str
+    balance: float
+
+class BalanceSnapshot(BaseModel):
+    """Every member's balance, sent when an event stream opens or has to catch up."""
+    group_id: int
+    balances: List[MemberBalance]
+
+class BalanceChange(BaseModel):
+    """How one member's balance moved in a write."""
+    user_id: int
+    delta: float
+    balance: float  # The new net balance
+
+class BalanceEvent(BaseModel):
+    """The balance changes made by one committed expense write."""
+    group_id: int
+    expense_ids: List[int]
+    changes: List[BalanceChange]
+
+class SpendingPeriod(BaseModel):
+    """A group's spending in one time bucket."""
+    period_start: date
+    total: float
+    expense_count: int
+
+class MemberSpending(BaseModel):
+    """What a member paid and owed over the whole report."""
+    user_id: int
+    username: str
+    paid: float
+    share: float
+    expenses_paid: int
+
+class MemberPeriod(BaseModel):
+    """What a member paid and owed in one time bucket."""
+    user_id: int
+    period_start: date
+    paid: float
+    share: float
+
+class GroupReport(BaseModel):
+    """Spending of a group over time and per member."""
+    group_id: int
+    bucket: str
+    start: Optional[date] = None
+    end: Optional[date] = None
+    total: float
+    expense_count: int
+    periods: List[SpendingPeriod] = []
+    members: List[MemberSpending] = []  # Most paid first
+    member_periods: List[MemberPeriod] = []
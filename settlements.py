@@ -0,0 +1,160 @@
+# settlements.py
+"""
+Settlement planning: turns a group's net balances into a list of transfers
+that brings every member back to zero.
+
+Two modes are offered:
+
+- greedy:  repeatedly matches the largest debtor with the largest creditor
+           using two heaps. O(n log n), at most n - 1 transfers.
+- minimal: the exact minimum number of transfers. n members whose balances
+           split into k zero-sum subsets can settle in n - k transfers, so
+           this searches for the partition with the most zero-sum subsets.
+           The search is exponential, so above EXACT_CUTOFF members with an
+           open balance it falls back to greedy.
+
+Balances are integer cents, so zero-sum checks are exact.
+"""
+
+import heapq
+from functools import lru_cache
+from typing import Dict, Hashable, List, NamedTuple, Tuple
+
+GREEDY = "greedy"
+MINIMAL = "minimal"
+MODES = (GREEDY, MINIMAL)
+
+# Largest number of open balances the exact search will take on
+EXACT_CUTOFF = 15
+
+
+class Transfer(NamedTuple):
+    debtor: Hashable
+    creditor: Hashable
+    amount_cents: int
+
+
+class Plan(NamedTuple):
+    transfers: List[Transfer]
+    optimal: bool  # True when the transfer count is proven minimal
+
+
+def greedy(balances: Dict[Hashable, int]) -> List[Transfer]:
+    """Largest debtor pays largest creditor until everyone is settled."""
+    # heapq is a min-heap, so amounts are negated; the index breaks ties
+    # without comparing member keys
+    debtors = [(amount, i, member) for i, (member, amount) in enumerate(balances.items()) if amount < 0]
+    creditors = [(-amount, i, member) for i, (member, amount) in enumerate(balances.items()) if amount > 0]
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+    transfers = []
+    while debtors and creditors:
+        debt, d_i, debtor = heapq.heappop(debtors)
+        credit, c_i, creditor = heapq.heappop(creditors)
+        payment = min(-debt, -credit)
+        transfers.append(Transfer(debtor, creditor, payment))
+
+        if -debt > payment:
+            heapq.heappush(debtors, (debt + payment, d_i, debtor))
+        if -credit > payment:
+            heapq.heappush(creditors, (credit + payment, c_i, creditor))
+    return transfers
+
+
+def _zero_sum_groups(amounts: Tuple[int, ...]) -> List[List[int]]:
+    """
+    Splits indexes of `amounts` into the largest number of zero-sum subsets.
+
+    best[mask] is the most zero-sum prefixes any ordering of the members in
+    `mask` can have. Backtracking from the full mask recovers one such
+    ordering, and cutting it at its zero-sum prefixes gives the subsets.
+    """
+    n = len(amounts)
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    best = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+        top = 0
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            if best[mask ^ bit] > top:
+                top = best[mask ^ bit]
+            rest ^= bit
+        best[mask] = top + (sums[mask] == 0)
+
+    order = []
+    mask = full
+    while mask:
+        target = best[mask] - (sums[mask] == 0)
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            if best[mask ^ bit] == target:
+                break
+            rest ^= bit
+        order.append(bit.bit_length() - 1)
+        mask ^= bit
+    order.reverse()
+
+    groups, current, running = [], [], 0
+    for index in order:
+        current.append(index)
+        running += amounts[index]
+        if running == 0:
+            groups.append(current)
+            current = []
+    if current:
+        # Balances that don't net to zero leave a remainder group
+        groups.append(current)
+    return groups
+
+
+def minimal(balances: Dict[Hashable, int], cutoff: int = EXACT_CUTOFF) -> Plan:
+    """The fewest transfers that settle the group, or greedy above the cutoff."""
+    # Exact opposite balances always settle in one transfer of their own
+    transfers = []
+    open_by_amount: Dict[int, List[Hashable]] = {}
+    remaining = {}
+    for member, amount in balances.items():
+        partners = open_by_amount.get(-amount)
+        if partners:
+            partner = partners.pop()
+            del remaining[partner]
+            debtor, creditor = (member, partner) if amount < 0 else (partner, member)
+            transfers.append(Transfer(debtor, creditor, abs(amount)))
+        else:
+            open_by_amount.setdefault(amount, []).append(member)
+            remaining[member] = amount
+
+    if len(remaining) > cutoff:
+        return Plan(transfers + greedy(remaining), optimal=False)
+
+    members = list(remaining)
+    amounts = tuple(remaining[member] for member in members)
+    for group in _zero_sum_groups(amounts):
+        # A zero-sum subset of k members settles in k - 1 transfers
+        transfers.extend(greedy({members[i]: amounts[i] for i in group}))
+    return Plan(transfers, optimal=True)
+
+
+@lru_cache(maxsize=1024)
+def _cached_plan(mode: str, balances: Tuple[Tuple[Hashable, int], ...]) -> Plan:
+    cents = dict(balances)
+    if mode == GREEDY:
+        return Plan(greedy(cents), optimal=len(cents) <= 2)
+    return minimal(cents)
+
+
+def plan(balances: Dict[Hashable, int], mode: str = MINIMAL) -> Plan:
+    """
+    Settlement plan for {member: net balance in cents}. Plans are cached on
+    the group's balance state, so repeated reads between expenses are free.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown settlement mode: {mode}")
+    # Settled members take no part in the plan
+    return _cached_plan(mode, tuple(sorted((m, amount) for m, amount in balances.items() if amount)))
@@ -0,0 +1,262 @@
+# snapshots.py
+"""
+Periodic checkpoints of the balance ledger.
+
+`balance_snapshots` holds every member's paid and share totals, in cents,
+over a group's expenses up to an Expense.id watermark. Expenses are only
+ever appended, so the current totals are the snapshot plus the sums over
+rows after the watermark, and recomputing the ledger (ledger.py verify
+and rebuild) only reads the expenses added since the last checkpoint
+instead of a group's whole history.
+
+Compaction folds newly added expenses into the snapshots and advances the
+watermark. It stops short of expenses inserted in the last
+SNAPSHOT_SETTLE_SECONDS (by Expense.recorded_at: imports keep an older
+created_at), so a transaction that took an id but has not committed yet
+is not stepped over. Run it from one place on a schedule, e.g. cron:
+
+    */5 * * * * python snapshots.py compact
+
+Setting SNAPSHOT_INTERVAL instead makes each API worker compact every that
+many seconds; concurrent compactions are safe, but every worker but one
+does the summing for nothing, so only set it where a single process
+serves the API. The snapshots can also be checked against a full
+recompute from the raw expense rows, or rebuilt:
+
+    python snapshots.py check [--group-id ID]
+    python snapshots.py rebuild
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal, missing_tables
+
+# Seconds between compactions inside each API worker; 0, the default, leaves it to the CLI
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", "0"))
+SETTLE_SECONDS = int(os.getenv("SNAPSHOT_SETTLE_SECONDS", "60"))
+# Groups whose snapshot rows are locked per query while compacting
+LOCK_BATCH = 500
+
+logger = logging.getLogger(__name__)
+
+Totals = Dict[Tuple[int, int], List[int]]
+
+
+def watermark(db: Session) -> int:
+    """Last Expense.id folded into the snapshots, 0 before the first compaction."""
+    return db.scalar(select(func.max(models.BalanceSnapshot.through_expense_id))) or 0
+
+
+def sums(db: Session, after_id: int, through_id: Optional[int] = None,
+         group_id: Optional[int] = None) -> Totals:
+    """{(group_id, user_id): [paid_cents, share_cents]} over the expenses with after_id < id <= through_id."""
+    paid_query = db.query(
+        models.Expense.group_id, models.Expense.paid_by_user_id, func.sum(models.Expense.amount_cents)
+    ).filter(models.Expense.id > after_id).group_by(models.Expense.group_id, models.Expense.paid_by_user_id)
+    share_query = db.query(
+        models.Expense.group_id, models.ExpenseParticipant.user_id, func.sum(models.ExpenseParticipant.share_cents)
+    ).join(models.Expense).filter(
+        models.Expense.id > after_id
+    ).group_by(models.Expense.group_id, models.ExpenseParticipant.user_id)
+
+    if through_id is not None:
+        paid_query = paid_query.filter(models.Expense.id <= through_id)
+        share_query = share_query.filter(models.Expense.id <= through_id)
+    if group_id is not None:
+        paid_query = paid_query.filter(models.Expense.group_id == group_id)
+        share_query = share_query.filter(models.Expense.group_id == group_id)
+
+    # MySQL returns SUM() over integers as DECIMAL, hence the int()
+    totals = defaultdict(lambda: [0, 0])
+    for g_id, user_id, paid in paid_query:
+        totals[(g_id, user_id)][0] += int(paid or 0)
+    for g_id, user_id, share in share_query:
+        totals[(g_id, user_id)][1] += int(share or 0)
+    return dict(totals)
+
+
+def _snapshot_rows(db: Session, group_id: Optional[int] = None):
+    query = db.query(models.BalanceSnapshot)
+    if group_id is not None:
+        query = query.filter(models.BalanceSnapshot.group_id == group_id)
+    return query
+
+
+def totals(db: Session, group_id: Optional[int] = None) -> Totals:
+    """Current {(group_id, user_id): [paid_cents, share_cents]}: the snapshots plus the expenses after the watermark."""
+    through = watermark(db)
+    result = {(row.group_id, row.user_id): [row.paid_cents, row.share_cents] for row in _snapshot_rows(db, group_id)}
+    for key, (paid, share) in sums(db, through, group_id=group_id).items():
+        current = result.setdefault(key, [0, 0])
+        current[0] += paid
+        current[1] += share
+    return result
+
+
+def _settled_id(db: Session, settle_seconds: int) -> int:
+    """Highest Expense.id inserted at least settle_seconds ago, by the database's clock."""
+    cutoff = db.scalar(select(func.now())) - timedelta(seconds=settle_seconds)
+    # Walks the primary key backwards from the newest expense, so only the unsettled tail is read
+    return db.scalar(
+        select(models.Expense.id).where(models.Expense.recorded_at <= cutoff)
+        .order_by(models.Expense.id.desc()).limit(1)
+    ) or 0
+
+
+def compact(db: Session, settle_seconds: int = SETTLE_SECONDS) -> int:
+    """
+    Folds the settled expenses after the watermark into the snapshots and commits.
+    Returns the number of snapshot rows written; 0 when there was nothing to fold,
+    or when a concurrent compaction got there first.
+    """
+    through = watermark(db)
+    new_through = _settled_id(db, settle_seconds)
+    if new_through <= through:
+        db.rollback()
+        return 0
+
+    # Never empty: every expense has a payer
+    deltas = sums(db, through, new_through)
+    # Lock the rows being advanced; one already past the old watermark means another compaction won
+    existing = {}
+    group_ids = sorted({g_id for g_id, _ in deltas})
+    for start in range(0, len(group_ids), LOCK_BATCH):
+        rows = db.query(models.BalanceSnapshot).filter(
+            models.BalanceSnapshot.group_id.in_(group_ids[start:start + LOCK_BATCH])
+        ).with_for_update().all()
+        existing.update(((row.group_id, row.user_id), row) for row in rows)
+    if any(row.through_expense_id > through for row in existing.values()):
+        db.rollback()
+        return 0
+
+    for (g_id, user_id), (paid, share) in deltas.items():
+        row = existing.get((g_id, user_id))
+        if row is None:
+            row = models.BalanceSnapshot(group_id=g_id, user_id=user_id, paid_cents=0, share_cents=0)
+            db.add(row)
+        row.paid_cents += paid
+        row.share_cents += share
+        row.through_expense_id = new_through
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent compaction inserted the same new rows
+        db.rollback()
+        return 0
+    return len(deltas)
+
+
+def rebuild(db: Session, settle_seconds: int = SETTLE_SECONDS, through_id: Optional[int] = None) -> int:
+    """
+    Replaces the snapshots with a full recompute up to the settled expenses, or up to
+    expense `through_id`. Returns the rows written.
+    """
+    new_through = _settled_id(db, settle_seconds) if through_id is None else through_id
+    recomputed = sums(db, 0, new_through)
+    # As in ledger.rebuild: loaded rows leave the session, so the new ones with the same keys don't clash
+    _snapshot_rows(db).delete(synchronize_session="fetch")
+    db.add_all(
+        models.BalanceSnapshot(
+            group_id=g_id, user_id=user_id, paid_cents=paid, share_cents=share, through_expense_id=new_through
+        )
+        for (g_id, user_id), (paid, share) in recomputed.items()
+    )
+    db.commit()
+    return len(recomputed)
+
+
+def mismatches(expected: Totals, actual: Totals, label: str) -> List[str]:
+    """
+    Describes every (group_id, user_id) whose `actual` totals differ from `expected`, for the
+    ledger's and the snapshots' checks. A missing row only matters if it should hold something.
+    """
+    problems = []
+    for key in sorted(set(expected) | set(actual)):
+        exp_paid, exp_share = expected.get(key, [0, 0])
+        if key not in actual:
+            if exp_paid or exp_share:
+                problems.append(f"group {key[0]} user {key[1]}: missing {label} row")
+            continue
+        paid, share = actual[key]
+        # Integer cents, so the comparison is exact
+        if paid != exp_paid or share != exp_share:
+            problems.append(
+                f"group {key[0]} user {key[1]}: {label} paid={paid} share={share} cents, "
+                f"expected paid={exp_paid} share={exp_share} cents"
+            )
+    return problems
+
+
+def check(db: Session, group_id: Optional[int] = None) -> List[str]:
+    """Compares the snapshots against a full recompute up to the watermark and describes every mismatch."""
+    expected = sums(db, 0, watermark(db), group_id)
+    actual = {(row.group_id, row.user_id): [row.paid_cents, row.share_cents] for row in _snapshot_rows(db, group_id)}
+    return mismatches(expected, actual, "snapshot")
+
+
+def _compact_once() -> int:
+    db = SessionLocal()
+    try:
+        return compact(db)
+    finally:
+        db.close()
+
+
+async def run_periodically(interval: int = SNAPSHOT_INTERVAL) -> None:
+    """Compacts every `interval` seconds until cancelled; the API starts it when SNAPSHOT_INTERVAL is set."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_compact_once)
+        except Exception:
+            # Try again next round; the ledger and balance reads don't depend on it
+            logger.exception("balance snapshot compaction failed")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compact, check or rebuild the balance snapshots.")
+    parser.add_argument("command", choices=["compact", "check", "rebuild"])
+    parser.add_argument("--group-id", type=int, default=None, help="limit the check to a single group")
+    parser.add_argument("--settle-seconds", type=int, default=SETTLE_SECONDS,
+                        help="leave expenses this recent for the next compaction")
+    args = parser.parse_args(argv)
+
+    if missing_tables():
+        print("The database is missing tables; run `python migrate.py` first.", file=sys.stderr)
+        return 2
+    db = SessionLocal()
+    try:
+        if args.command == "compact":
+            count = compact(db, args.settle_seconds)
+            print(f"Advanced {count} snapshot rows to expense {watermark(db)}")
+            return 0
+        if args.command == "rebuild":
+            count = rebuild(db, args.settle_seconds)
+            print(f"Rebuilt {count} snapshot rows through expense {watermark(db)}")
+            return 0
+
+        problems = check(db, args.group_id)
+        for problem in problems:
+            print(problem)
+        through = watermark(db)
+        print(f"Snapshots OK through expense {through}" if not problems
+              else f"{len(problems)} snapshot mismatches through expense {through}")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# tests/conftest.py
+"""
+Shared fixtures. The suite runs against a throwaway SQLite file with the
+sync engine, the in-process cache and event broker, and no replicas;
+each test that asks for `db` or `client` starts on empty tables.
+
+    pip install -r requirements-dev.txt
+    python -m pytest
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Set before anything imports database.py, which reads them once; .env does not override them
+_DB_DIR = tempfile.mkdtemp(prefix="cissplit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["DATABASE_ASYNC"] = "false"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["CACHE_URL"] = ""
+os.environ["EVENTS_URL"] = ""
+os.environ["SNAPSHOT_INTERVAL"] = "0"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import cache  # noqa: E402
+import ledger  # noqa: E402
+import main as api  # noqa: E402
+import models  # noqa: E402
+import schemas  # noqa: E402
+from database import SessionLocal, get_engine  # noqa: E402
+
+
+@pytest.fixture
+def empty_database():
+    """Recreates every table and forgets cached reads."""
+    engine = get_engine()
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    cache.configure(cache.LRUBackend())
+    return engine
+
+
+@pytest.fixture
+def db(empty_database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(empty_database):
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def count_statements():
+    """Context manager counting the SQL statements run inside it: `with count_statements() as counted: ...; counted[0]`."""
+    engine = get_engine()
+
+    @contextmanager
+    def counting():
+        counted = [0]
+
+        def count(*_):
+            counted[0] += 1
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            yield counted
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+
+    return counting
+
+
+def make_group(db, name, member_count, expense_count=0, users=None):
+    """Creates a group of new members (plus `users`, if given) and adds equal-split expenses paid in turn."""
+    members = list(users or [])
+    for n in range(member_count):
+        user = models.User(username=f"{name}-user-{n}", email=f"{name}-user-{n}@example.com")
+        db.add(user)
+        members.append(user)
+    group = models.Group(name=name, members=members)
+    db.add(group)
+    db.flush()
+    ledger.init_members(db, group.id, [member.id for member in members])
+    db.commit()
+
+    member_ids = [member.id for member in members]
+    for n in range(expense_count):
+        api._create_expense(db, group.id, schemas.ExpenseCreate(
+            description=f"{name} expense {n}", amount=10 + n,
+            paid_by_user_id=member_ids[n % len(member_ids)], participant_user_ids=member_ids,
+        ))
+    return group, members
@@ -0,0 +1,29 @@
+# tests/test_cache.py
+from conftest import make_group
+
+
+def test_summary_revalidates_until_a_write_changes_it(client, db):
+    group, members = make_group(db, "etag", 2, expense_count=1)
+    member_ids = [member.id for member in members]
+    params = {"email": members[0].email}
+
+    first = client.get("/users/summary/", params=params)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    unchanged = client.get("/users/summary/", params=params, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert unchanged.content == b""
+
+    assert client.post(f"/groups/{group.id}/expenses/", json={
+        "description": "more", "amount": 8, "paid_by_user_id": member_ids[1], "participant_user_ids": member_ids,
+    }).status_code == 201
+    changed = client.get("/users/summary/", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["groups"][0]["expense_count"] == 2
+
+
+def test_summary_of_an_unknown_email_is_404(client, db):
+    assert client.get("/users/summary/", params={"email": "nobody@example.com"}).status_code == 404
@@ -0,0 +1,98 @@
+# tests/test_events.py
+import asyncio
+import json
+
+from sqlalchemy import create_engine
+
+import database
+import main as api
+from conftest import make_group
+from database import SessionLocal
+
+# Fewer connections than open streams, as in DATABASE_POOL_SIZE=2 DATABASE_MAX_OVERFLOW=1
+POOL = {"pool_size": 2, "max_overflow": 1, "pool_timeout": 2}
+STREAMS = 5
+
+
+def _scope(method, path, body=b""):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "server": ("testserver", 80), "client": ("testclient", 50000),
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())],
+    }
+
+
+async def _open_stream(path):
+    """Starts a GET and returns once its first event is out, with the task and the event that disconnects it."""
+    first_event = asyncio.Event()
+    disconnect = asyncio.Event()
+    status = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message.get("body"):
+            first_event.set()
+
+    task = asyncio.create_task(api.app(_scope("GET", path), receive, send))
+    await asyncio.wait_for(first_event.wait(), 5)
+    assert status == [200]
+    return task, disconnect
+
+
+async def _post(path, payload):
+    body = json.dumps(payload).encode()
+    status = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await api.app(_scope("POST", path, body), receive, send)
+    return status[0]
+
+
+def test_open_streams_do_not_hold_connections(db, monkeypatch):
+    group, members = make_group(db, "events", 3)
+    group_id, member_ids = group.id, [member.id for member in members]
+
+    engine = create_engine(database.DATABASE_URL, connect_args=database.CONNECT_ARGS, **POOL)
+    monkeypatch.setitem(SessionLocal.kw, "bind", engine)
+
+    async def scenario():
+        streams = [await _open_stream(f"/groups/{group_id}/events") for _ in range(STREAMS)]
+        try:
+            return await _post(f"/groups/{group_id}/expenses/", {
+                "description": "dinner", "amount": 30, "paid_by_user_id": member_ids[0],
+                "participant_user_ids": member_ids,
+            })
+        finally:
+            for task, disconnect in streams:
+                disconnect.set()
+                task.cancel()
+            await asyncio.gather(*(task for task, _ in streams), return_exceptions=True)
+
+    try:
+        assert asyncio.run(scenario()) == 201
+        assert engine.pool.checkedout() == 0
+    finally:
+        engine.dispose()
@@ -0,0 +1,22 @@
+# tests/test_expense_stream.py
+import json
+
+from conftest import make_group
+
+
+def test_ndjson_streams_every_expense_after_the_cursor(client, db):
+    group, _ = make_group(db, "stream", 3, expense_count=7)
+
+    response = client.get(f"/groups/{group.id}/expenses/", params={"format": "ndjson", "limit": 3})
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["description"] for item in items] == [f"stream expense {n}" for n in range(7)]
+
+    response = client.get(f"/groups/{group.id}/expenses/",
+                          params={"format": "ndjson", "after_id": items[4]["id"]})
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [items[5]["id"], items[6]["id"]]
+
+
+def test_ndjson_of_a_missing_group_is_404(client):
+    response = client.get("/groups/999/expenses/", params={"format": "ndjson"})
+    assert response.status_code == 404
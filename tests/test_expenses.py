@@ -0,0 +1,81 @@
+# tests/test_expenses.py
+import pytest
+
+from conftest import make_group
+
+
+def _expense(member_ids, **fields):
+    return {"description": "dinner", "amount": 30, "paid_by_user_id": member_ids[0],
+            "participant_user_ids": member_ids, **fields}
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "-Infinity", "0", "-5", "1e13"])
+def test_amount_must_be_positive_finite_and_bounded(client, db, amount):
+    group, members = make_group(db, "amounts", 2)
+    payer, other = (member.id for member in members)
+    # Written out by hand: NaN and Infinity are not JSON, but the API's parser accepts them
+    body = (f'{{"description": "x", "amount": {amount}, "paid_by_user_id": {payer}, '
+            f'"participant_user_ids": [{payer}, {other}]}}')
+
+    response = client.post(f"/groups/{group.id}/expenses/", content=body,
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity"])
+def test_split_values_must_be_finite(client, db, value):
+    group, members = make_group(db, "split-values", 2)
+    payer, other = (member.id for member in members)
+    body = (f'{{"description": "x", "amount": 30, "paid_by_user_id": {payer}, '
+            f'"participant_user_ids": [{payer}, {other}], "split": "shares", "split_values": [{value}, 1]}}')
+
+    response = client.post(f"/groups/{group.id}/expenses/", content=body,
+                           headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_expense_with_an_outsider_is_rejected(client, db):
+    group, members = make_group(db, "members", 2)
+    _, (outsider,) = make_group(db, "others", 1)
+    member_ids = [member.id for member in members]
+
+    for payload in (_expense(member_ids, paid_by_user_id=outsider.id),
+                    _expense(member_ids + [outsider.id])):
+        response = client.post(f"/groups/{group.id}/expenses/", json=payload)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Payer and participants must be members of the group."
+
+    assert client.post("/groups/999/expenses/", json=_expense(member_ids)).status_code == 404
+    balances = client.get(f"/groups/{group.id}/balances/").json()
+    assert balances == {member.username: 0 for member in members}
+
+
+def test_bulk_commits_valid_rows_and_reports_the_rest(client, db):
+    group, members = make_group(db, "bulk", 3)
+    _, (outsider,) = make_group(db, "bulk-others", 1)
+    member_ids = [member.id for member in members]
+
+    response = client.post(f"/groups/{group.id}/expenses/bulk", json=[
+        _expense(member_ids, description="ok 0"),
+        _expense(member_ids, participant_user_ids=[]),
+        _expense(member_ids, paid_by_user_id=outsider.id),
+        _expense(member_ids, description="ok 1", split="percentage", split_values=[50, 50, 0]),
+        _expense([member_ids[0], member_ids[0]]),
+        _expense(member_ids, split="percentage", split_values=[50, 40, 0]),
+    ])
+    assert response.status_code == 201
+    result = response.json()
+    assert [(error["index"], error["detail"]) for error in result["errors"]] == [
+        (1, "Expense must have at least one participant."),
+        (2, "Payer and participants must be members of the group."),
+        (4, "Participant user IDs must be unique."),
+        (5, "Percentages add up to 90, not 100."),
+    ]
+    assert len(result["created_ids"]) == 2
+
+    listed = client.get(f"/groups/{group.id}/expenses/").json()["items"]
+    assert [item["id"] for item in listed] == result["created_ids"]
+    assert [item["description"] for item in listed] == ["ok 0", "ok 1"]
+    # The ledger took in the accepted rows only: 30 + 30 paid by the first member
+    balances = client.get(f"/groups/{group.id}/balances/").json()
+    assert balances == {members[0].username: 60 - 10 - 15, members[1].username: -10 - 15, members[2].username: -10}
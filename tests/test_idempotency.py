@@ -0,0 +1,61 @@
+# tests/test_idempotency.py
+from sqlalchemy import func, select
+
+import models
+from conftest import make_group
+
+
+def expense(group_members, amount=30.0):
+    member_ids = [member.id for member in group_members]
+    return {"description": "dinner", "amount": amount, "paid_by_user_id": member_ids[0], "participant_user_ids": member_ids}
+
+
+def expense_count(db):
+    return db.scalar(select(func.count()).select_from(models.Expense))
+
+
+def test_retry_replays_the_stored_response(client, db):
+    group, members = make_group(db, "trip", member_count=3)
+    headers = {"Idempotency-Key": "retry-1"}
+
+    first = client.post(f"/groups/{group.id}/expenses/", json=expense(members), headers=headers)
+    retry = client.post(f"/groups/{group.id}/expenses/", json=expense(members), headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert expense_count(db) == 1
+    balances = client.get(f"/groups/{group.id}/balances/").json()
+    assert sorted(balances.values()) == [-10.0, -10.0, 20.0]
+
+
+def test_reusing_a_key_for_another_request_is_rejected(client, db):
+    group, members = make_group(db, "trip", member_count=2)
+    headers = {"Idempotency-Key": "reused"}
+
+    assert client.post(f"/groups/{group.id}/expenses/", json=expense(members), headers=headers).status_code == 201
+    response = client.post(f"/groups/{group.id}/expenses/", json=expense(members, amount=99.0), headers=headers)
+    assert response.status_code == 422
+    assert expense_count(db) == 1
+
+
+def test_bulk_retry_is_replayed(client, db):
+    group, members = make_group(db, "trip", member_count=2)
+    headers = {"Idempotency-Key": "bulk-1"}
+    body = [expense(members), expense(members, amount=12.0)]
+
+    first = client.post(f"/groups/{group.id}/expenses/bulk", json=body, headers=headers)
+    retry = client.post(f"/groups/{group.id}/expenses/bulk", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert len(first.json()["created_ids"]) == 2
+    assert expense_count(db) == 2
+
+
+def test_requests_without_a_key_are_not_deduplicated(client, db):
+    group, members = make_group(db, "trip", member_count=2)
+    for _ in range(2):
+        assert client.post(f"/groups/{group.id}/expenses/", json=expense(members)).status_code == 201
+    assert expense_count(db) == 2
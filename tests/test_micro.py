@@ -0,0 +1,55 @@
+# tests/test_micro.py
+"""
+The hot-path cases of benchmarks/micro.py as pytest-benchmark tests, on a
+small generated dataset:
+
+    python -m pytest tests/test_micro.py --benchmark-only
+
+For numbers worth comparing, run benchmarks/micro.py on a database filled
+by benchmarks/generate.py instead.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import generate  # noqa: E402
+import micro  # noqa: E402
+from database import SessionLocal  # noqa: E402
+
+CASES = [
+    "group_balances median group",
+    "group_balances largest group",
+    "user_summary",
+    "create_expense median group",
+    "expense page largest group",
+    "monthly report largest group",
+    "settlement greedy largest group",
+    "settlement minimal largest group",
+]
+
+
+@pytest.fixture(scope="module")
+def cases():
+    manifest = generate.generate(
+        users=300, groups=40, expenses=2000, skew=1.2, max_group_size=60, days=90, seed=1
+    )
+    return dict(micro.cases(manifest))
+
+
+def test_cases_are_covered(cases):
+    assert sorted(cases) == sorted(CASES)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_micro(benchmark, cases, name):
+    fn = cases[name]
+
+    def call():
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    benchmark(call)
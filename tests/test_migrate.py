@@ -0,0 +1,76 @@
+# tests/test_migrate.py
+from sqlalchemy import create_engine, text
+
+import migrate
+from database import CONNECT_ARGS
+
+# The tables as they were before money moved to cents
+FLOAT_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(255) NOT NULL UNIQUE, "
+    "email VARCHAR(255) NOT NULL UNIQUE)",
+    "CREATE TABLE groups (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL)",
+    "CREATE TABLE group_members (group_id INTEGER REFERENCES groups(id), user_id INTEGER REFERENCES users(id), "
+    "PRIMARY KEY (group_id, user_id))",
+    "CREATE TABLE expenses (id INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, amount FLOAT NOT NULL, "
+    "group_id INTEGER REFERENCES groups(id), paid_by_user_id INTEGER REFERENCES users(id))",
+    "CREATE TABLE expense_participants (expense_id INTEGER REFERENCES expenses(id), "
+    "user_id INTEGER REFERENCES users(id), share_amount FLOAT NOT NULL, PRIMARY KEY (expense_id, user_id))",
+    "CREATE TABLE group_balances (group_id INTEGER REFERENCES groups(id), user_id INTEGER REFERENCES users(id), "
+    "paid FLOAT NOT NULL, share FLOAT NOT NULL, PRIMARY KEY (group_id, user_id))",
+    "INSERT INTO users VALUES (1, 'a', 'a@example.com'), (2, 'b', 'b@example.com'), (3, 'c', 'c@example.com')",
+    "INSERT INTO groups VALUES (1, 'trip')",
+    "INSERT INTO group_members VALUES (1, 1), (1, 2), (1, 3)",
+    "INSERT INTO expenses VALUES (1, 'dinner', 10.0, 1, 1), (2, 'taxi', 0.05, 1, 2)",
+    "INSERT INTO expense_participants VALUES (1, 1, 3.33), (1, 2, 3.33), (1, 3, 3.33), (2, 1, 0.03), (2, 2, 0.03)",
+]
+
+# (expenses, shares, ledger) in cents afterwards: 10.00 split three ways and 0.05 two ways
+MIGRATED = (
+    [(1, 1000), (2, 5)],
+    [(1, 1, 334), (1, 2, 333), (1, 3, 333), (2, 1, 3), (2, 2, 2)],
+    [(1, 1000, 337), (2, 5, 335), (3, 0, 333)],
+)
+
+
+def _float_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}", connect_args=CONNECT_ARGS)
+    with engine.begin() as conn:
+        for statement in FLOAT_SCHEMA:
+            conn.execute(text(statement))
+    return engine
+
+
+def _migrate(engine):
+    for migration in migrate.MIGRATIONS:
+        migration(engine)
+
+
+def _state(engine):
+    with engine.connect() as conn:
+        return (
+            conn.execute(text("SELECT id, amount_cents FROM expenses ORDER BY id")).all(),
+            conn.execute(text(
+                "SELECT expense_id, user_id, share_cents FROM expense_participants ORDER BY expense_id, user_id"
+            )).all(),
+            conn.execute(text("SELECT user_id, paid_cents, share_cents FROM group_balances ORDER BY user_id")).all(),
+        )
+
+
+def test_money_migration_splits_exactly(tmp_path):
+    engine = _float_database(tmp_path)
+    _migrate(engine)
+    assert _state(engine) == MIGRATED
+    assert migrate.money_to_minor_units(engine) is False
+    engine.dispose()
+
+
+def test_money_migration_finishes_an_interrupted_run(tmp_path):
+    engine = _float_database(tmp_path)
+    # What a run that failed after its first ALTERs left behind on MySQL
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE expenses ADD COLUMN amount_cents BIGINT NOT NULL DEFAULT 0"))
+        conn.execute(text("UPDATE expenses SET amount_cents = ROUND(amount * 100) WHERE id = 1"))
+        conn.execute(text("ALTER TABLE expense_participants ADD COLUMN share_cents BIGINT NOT NULL DEFAULT 0"))
+    _migrate(engine)
+    assert _state(engine) == MIGRATED
+    engine.dispose()
@@ -0,0 +1,58 @@
+# tests/test_money.py
+import pytest
+
+from money import EQUAL, EXACT, PERCENTAGE, SHARES, SplitError, split, split_evenly, to_cents
+
+
+def test_split_evenly_gives_leftover_cents_to_the_first_shares():
+    assert split_evenly(1000, 3) == [334, 333, 333]
+    assert split_evenly(2, 3) == [1, 1, 0]
+
+
+@pytest.mark.parametrize("total", [1, 99, 1000, 1001, 123457])
+@pytest.mark.parametrize("parts", [1, 2, 3, 7])
+def test_equal_split_sums_to_the_total(total, parts):
+    shares = split(total, EQUAL, parts)
+    assert sum(shares) == total
+    assert max(shares) - min(shares) <= 1
+
+
+def test_shares_split_by_weight():
+    assert split(1000, SHARES, 3, [2, 1, 1]) == [500, 250, 250]
+    # 1000 / 3 each: the leftover cent goes to the first tied remainder
+    assert split(1000, SHARES, 3, [1, 1, 1]) == [334, 333, 333]
+    assert split(1000, SHARES, 2, [0, 3]) == [0, 1000]
+
+
+def test_percentage_split():
+    assert split(1000, PERCENTAGE, 2, [25, 75]) == [250, 750]
+    shares = split(1001, PERCENTAGE, 3, [33.33, 33.33, 33.34])
+    assert sum(shares) == 1001
+
+
+def test_percentage_defaults_of_the_app_are_accepted():
+    for parts in range(1, 13):
+        percentages = [hundredths / 100 for hundredths in split_evenly(100 * 100, parts)]
+        assert sum(split(999, PERCENTAGE, parts, percentages)) == 999
+
+
+def test_exact_split():
+    assert split(to_cents(30.0), EXACT, 3, [10.5, 9.5, 10.0]) == [1050, 950, 1000]
+
+
+@pytest.mark.parametrize("method, parts, values, message", [
+    (EQUAL, 2, [1, 1], "only apply"),
+    (SHARES, 2, [1], "one split value per participant"),
+    (SHARES, 2, [0, 0], "above zero"),
+    (SHARES, 2, [-1, 2], "negative"),
+    (SHARES, 2, [float("inf"), 1], "finite"),
+    (PERCENTAGE, 2, [float("nan"), 100], "finite"),
+    (EXACT, 2, [float("-inf"), 5.0], "finite"),
+    (PERCENTAGE, 3, [33.33, 33.33, 33.33], "99.99"),
+    (EXACT, 2, [4.0, 5.0], "add up to 9.0"),
+    ("thirds", 2, None, "Unknown split"),
+    (EQUAL, 0, None, "at least one participant"),
+])
+def test_invalid_splits_are_rejected(method, parts, values, message):
+    with pytest.raises(SplitError, match=message):
+        split(1000, method, parts, values)
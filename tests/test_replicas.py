@@ -0,0 +1,47 @@
+# tests/test_replicas.py
+import itertools
+import sqlite3
+import time
+
+from sqlalchemy import create_engine
+
+import database
+from conftest import make_group
+from database import CONNECT_ARGS, get_engine
+
+WINDOW = 0.5
+
+
+def test_reads_stay_on_the_primary_for_the_cookie_window(client, db, monkeypatch, tmp_path):
+    group, members = make_group(db, "replicas", 2)
+    member_ids = [member.id for member in members]
+
+    # The replica stand-in is a copy of the primary that never catches up
+    replica_path = tmp_path / "replica.db"
+    with sqlite3.connect(get_engine().url.database) as primary, sqlite3.connect(replica_path) as replica:
+        primary.backup(replica)
+    replica_url = f"sqlite:///{replica_path}"
+    replica_engine = create_engine(replica_url, connect_args=CONNECT_ARGS)
+    monkeypatch.setattr(database, "DATABASE_REPLICA_URLS", [replica_url])
+    monkeypatch.setattr(database, "replica_engines", [replica_engine], raising=False)
+    monkeypatch.setattr(database, "_next_replica", itertools.cycle([0]), raising=False)
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", WINDOW)
+
+    def listed():
+        response = client.get(f"/groups/{group.id}/expenses/")
+        assert response.status_code == 200
+        return len(response.json()["items"])
+
+    response = client.post(f"/groups/{group.id}/expenses/", json={
+        "description": "dinner", "amount": 30, "paid_by_user_id": member_ids[0], "participant_user_ids": member_ids,
+    })
+    assert response.status_code == 201
+    assert database.READ_PRIMARY_COOKIE in response.cookies
+
+    # Inside the window the write is read back from the primary
+    assert listed() == 1
+    time.sleep(WINDOW + 0.1)
+    # The cookie is still sent, but its time has passed: back on the lagging replica
+    assert client.cookies.get(database.READ_PRIMARY_COOKIE) is not None
+    assert listed() == 0
+    replica_engine.dispose()
@@ -0,0 +1,60 @@
+# tests/test_settlements.py
+import random
+from collections import defaultdict
+
+import pytest
+
+import settlements
+
+
+def apply(transfers):
+    """Net effect of the transfers on each member, in cents."""
+    moved = defaultdict(int)
+    for transfer in transfers:
+        assert transfer.amount_cents > 0
+        moved[transfer.debtor] += transfer.amount_cents
+        moved[transfer.creditor] -= transfer.amount_cents
+    return moved
+
+
+def assert_settles(balances, transfers):
+    moved = apply(transfers)
+    assert all(balances.get(member, 0) + moved[member] == 0 for member in set(balances) | set(moved))
+
+
+def test_minimal_beats_greedy_on_zero_sum_subsets():
+    # {b, d, e} and {a, c, f} settle separately in two transfers each; greedy needs five
+    balances = {"a": -600, "b": -500, "c": -400, "d": 200, "e": 300, "f": 1000}
+    plan = settlements.minimal(balances)
+    assert plan.optimal
+    assert_settles(balances, plan.transfers)
+    assert len(plan.transfers) == 4
+    assert len(settlements.greedy(balances)) == 5
+
+
+def test_minimal_matches_opposite_balances_directly():
+    plan = settlements.minimal({"a": -250, "b": 250})
+    assert plan.transfers == [settlements.Transfer("a", "b", 250)]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_minimal_settles_and_never_needs_more_than_greedy(seed):
+    rng = random.Random(seed)
+    amounts = [rng.choice([0, rng.randint(-5000, 5000)]) for _ in range(rng.randint(2, 12))]
+    amounts.append(-sum(amounts))
+    balances = {member: amount for member, amount in enumerate(amounts) if amount}
+
+    plan = settlements.minimal(balances)
+    greedy = settlements.greedy(balances)
+    assert plan.optimal
+    assert_settles(balances, plan.transfers)
+    assert_settles(balances, greedy)
+    assert len(plan.transfers) <= len(greedy)
+
+
+def test_minimal_falls_back_to_greedy_above_the_cutoff():
+    balances = {member: (member + 1) * (1 if member % 2 else -1) for member in range(20)}
+    balances[20] = -sum(balances.values())
+    plan = settlements.minimal(balances, cutoff=5)
+    assert not plan.optimal
+    assert_settles(balances, plan.transfers)
@@ -0,0 +1,26 @@
+# tests/test_summary_queries.py
+"""/users/summary/ must issue the same number of statements however many groups and expenses a user has."""
+
+from conftest import make_group
+
+
+def summary_statements(client, count_statements, email):
+    with count_statements() as counted:
+        response = client.get("/users/summary/", params={"email": email})
+    assert response.status_code == 200
+    return counted[0], response.json()
+
+
+def test_summary_statement_count_is_constant(client, db, count_statements):
+    _, (small_user, *_) = make_group(db, "small", member_count=2, expense_count=1)
+
+    big_user = make_group(db, "big-0", member_count=3, expense_count=5)[1][0]
+    for n in range(1, 6):
+        make_group(db, f"big-{n}", member_count=3, expense_count=5 + n, users=[big_user])
+
+    small_count, small = summary_statements(client, count_statements, small_user.email)
+    big_count, big = summary_statements(client, count_statements, big_user.email)
+
+    assert len(small["groups"]) == 1
+    assert len(big["groups"]) == 6
+    assert 0 < big_count == small_count